@@ -0,0 +1,138 @@
+"""
+Per-tick cost of every text effect, measured against the headless obspython
+Usage: python bench/bench_effects.py [--ticks 200] [--lengths 10 100 1000]
+       [--window 3 --window-unit lines] [--frames 2]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+here = Path(__file__).resolve().parent
+sys.path.insert(0, str(here.parent))
+sys.path.insert(0, str(here))  # fake obspython shadows the real one
+
+import obspython as obs
+import scripted_text
+
+LOOKUPS = ("obs_get_source_by_name", "obs_source_get_unversioned_id")
+FILTER_OPS = (
+    "obs_source_get_filter_by_name",
+    "obs_source_filter_add",
+    "obs_source_filter_remove",
+    "obs_source_create_private",
+)
+
+
+class SimulatedClock:
+    """monotonic replacement, advanced one refresh_rate per tick"""
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    def __call__(self):
+        return self.seconds
+
+    def advance(self, ms):
+        self.seconds += ms / 1000
+
+
+def sample_text(effect, length):
+    words = "lorem ipsum;dolor $s $cs sit;amet $pc\n"
+    text = (words * (length // len(words) + 1))[:length]
+    if effect == "rainbow":
+        return text.replace(";", " ") + ";0xff00ff,0x00ff00"
+    return text
+
+
+def run(
+    effect, length, ticks, refresh_rate, window=0, window_unit="lines", frames=0
+):
+    obs.reset()
+    scripted_text.source_cache.invalidate()
+    obs.add_source("bench text")
+    obs.add_scene("bench scene", "bench text")
+    clock = scripted_text.monotonic = SimulatedClock()
+
+    driver = scripted_text.Driver()
+    driver.source_name = "bench text"
+    driver.effect = effect
+    driver.scripted_text = sample_text(effect, length)
+    driver.refresh_rate = refresh_rate
+    driver.refresh_frames = frames
+    if frames:  # ticked by script_tick, one call per video frame
+        frame_ms = scripted_text.frame_interval()
+        refresh_rate = driver.refresh_rate = frames * frame_ms
+    driver.window_size = window
+    driver.window_unit = window_unit
+    driver.effect_duration = (ticks + 10) * refresh_rate
+    driver.hotkey_hook()
+
+    def advance():
+        if not frames:
+            clock.advance(refresh_rate)
+            obs.run_timers(refresh_rate)
+            return
+        for _ in range(frames):
+            clock.advance(frame_ms)
+            scripted_text.script_tick(frame_ms / 1000)
+
+    obs.calls.clear()
+    started = time.perf_counter()
+    for _ in range(ticks):
+        advance()
+    elapsed = time.perf_counter() - started
+    driver.reset_duration()
+    advance()
+
+    calls = obs.calls
+    return {
+        "effect": effect,
+        "length": length,
+        "us/tick": 1e6 * elapsed / ticks,
+        "allocs/tick": calls["obs_data_create"] / ticks,
+        "updates/tick": calls["obs_source_update"] / ticks,
+        "lookups/tick": sum(calls[i] for i in LOOKUPS) / ticks,
+        "filter ops/tick": sum(calls[i] for i in FILTER_OPS) / ticks,
+        "api calls/tick": sum(calls.values()) / ticks,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--lengths", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--refresh-rate", type=int, default=15)
+    parser.add_argument("--effects", nargs="+", default=None)
+    parser.add_argument("--window", type=int, default=0)
+    parser.add_argument("--window-unit", choices=("lines", "chars"), default="lines")
+    parser.add_argument("--frames", type=int, default=0, help="refresh rate in frames")
+    args = parser.parse_args()
+
+    scripted_text.effects.discover()
+    effects = args.effects or sorted(scripted_text.effects.names())
+    columns = None
+    for effect in effects:
+        for length in args.lengths:
+            row = run(
+                effect,
+                length,
+                args.ticks,
+                args.refresh_rate,
+                args.window,
+                args.window_unit,
+                args.frames,
+            )
+            if columns is None:
+                columns = list(row)
+                print("".join(f"{i:>16}" for i in columns))
+            print(
+                "".join(
+                    f"{row[i]:>16.2f}" if isinstance(row[i], float) else f"{row[i]:>16}"
+                    for i in columns
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""
+Headless stand-in for obspython, records calls made by scripted_text.py
+Only for benchmarks, unknown functions are recorded and return None
+"""
+from collections import Counter
+
+OBS_INVALID_HOTKEY_ID = -1
+OBS_TEXT_MULTILINE = 2
+OBS_TEXT_DEFAULT = 0
+OBS_TEXT_INFO = 3
+OBS_PATH_FILE = 0
+OBS_COMBO_TYPE_EDITABLE = 1
+OBS_COMBO_TYPE_LIST = 2
+OBS_COMBO_FORMAT_STRING = 3
+OBS_COMBO_FORMAT_INT = 1
+OBS_GROUP_NORMAL = 1
+OBS_SOURCE_AUDIO = 1 << 1
+OBS_SOURCE_DO_NOT_DUPLICATE = 1 << 7
+OBS_SOURCE_DO_NOT_SELF_MONITOR = 1 << 9
+OBS_SOURCE_TYPE_INPUT = 0
+OBS_SOURCE_TYPE_FILTER = 1
+OBS_SOURCE_TYPE_TRANSITION = 2
+OBS_SOURCE_TYPE_SCENE = 3
+OBS_FRONTEND_EVENT_SCENE_CHANGED = 8
+OBS_FRONTEND_EVENT_PREVIEW_SCENE_CHANGED = 23
+
+calls = Counter()
+sources = {}
+scenes = {}
+timers = []
+_current = [None]
+
+
+def reset():
+    calls.clear()
+    sources.clear()
+    scenes.clear()
+    del timers[:]
+
+
+class Source:
+    def __init__(self, name, id="text_gdiplus"):
+        self.name = name
+        self.id = id
+        self.settings = {}
+        self.filters = {}
+        self.enabled = True
+        self.active = True
+        self.showing = True
+        self.items = []
+
+
+class Scene:
+    def __init__(self, source):
+        self.source = source
+        self.items = []
+
+
+class SceneItem:
+    def __init__(self, scene, source):
+        self.scene = scene
+        self.source = source
+        self.pos = vec2()
+
+
+class Data(dict):
+    pass
+
+
+class vec2:
+    def __init__(self):
+        self.x = 0.0
+        self.y = 0.0
+
+
+def _record(name):
+    calls[name] += 1
+
+
+def add_source(name, id="text_gdiplus"):
+    sources[name] = Source(name, id)
+    return sources[name]
+
+
+def add_scene(name, *source_names):
+    scene = Scene(add_source(name, "scene"))
+    for source_name in source_names:
+        item = SceneItem(scene, sources[source_name])
+        scene.items.append(item)
+        sources[source_name].items.append(item)
+    scenes[name] = scene
+    return scene
+
+
+def obs_frontend_get_current_scene():
+    _record("obs_frontend_get_current_scene")
+    return next(iter(scenes.values())).source if scenes else None
+
+
+def obs_frontend_get_scenes():
+    _record("obs_frontend_get_scenes")
+    return [scene.source for scene in scenes.values()]
+
+
+def obs_frontend_get_scene_names():
+    _record("obs_frontend_get_scene_names")
+    return list(scenes)
+
+
+def obs_enum_sources():
+    _record("obs_enum_sources")
+    return [s for s in sources.values() if s.id != "scene"]
+
+
+def source_list_release(sources):
+    _record("source_list_release")
+
+
+def obs_scene_from_source(source):
+    _record("obs_scene_from_source")
+    return scenes.get(source.name) if source is not None else None
+
+
+def obs_scene_get_source(scene):
+    return scene.source if scene is not None else None
+
+
+def obs_scene_release(scene):
+    _record("obs_scene_release")
+
+
+def obs_scene_find_source(scene, name):
+    _record("obs_scene_find_source")
+    if scene is None:
+        return None
+    for item in scene.items:
+        if item.source.name == name:
+            return item
+    return None
+
+
+def obs_scene_find_source_recursive(scene, name):
+    return obs_scene_find_source(scene, name)
+
+
+def obs_sceneitem_get_source(item):
+    return item.source
+
+
+def obs_sceneitem_get_pos(item, pos):
+    _record("obs_sceneitem_get_pos")
+    if item is not None:
+        pos.x, pos.y = item.pos.x, item.pos.y
+
+
+def obs_sceneitem_set_pos(item, pos):
+    _record("obs_sceneitem_set_pos")
+    if item is not None:
+        item.pos.x, item.pos.y = pos.x, pos.y
+
+
+def obs_source_get_output_flags(source):
+    return 0
+
+
+def obs_source_get_type(source):
+    return OBS_SOURCE_TYPE_SCENE if source.id == "scene" else OBS_SOURCE_TYPE_INPUT
+
+
+def calldata_source(calldata, name):
+    return calldata.get(name)
+
+
+def calldata_string(calldata, name):
+    return calldata.get(name)
+
+
+def obs_get_source_by_name(name):
+    _record("obs_get_source_by_name")
+    return sources.get(name)
+
+
+def obs_source_release(source):
+    _record("obs_source_release")
+
+
+def obs_source_get_ref(source):
+    _record("obs_source_get_ref")
+    return source
+
+
+def obs_source_get_unversioned_id(source):
+    _record("obs_source_get_unversioned_id")
+    return source.id if source is not None else None
+
+
+def obs_source_get_name(source):
+    return source.name if source is not None else None
+
+
+def obs_data_create():
+    _record("obs_data_create")
+    return Data()
+
+
+def obs_data_release(data):
+    _record("obs_data_release")
+
+
+def obs_data_set_string(data, key, value):
+    data[key] = value
+
+
+def obs_data_set_int(data, key, value):
+    data[key] = value
+
+
+def obs_data_set_double(data, key, value):
+    data[key] = value
+
+
+def obs_source_get_settings(source):
+    _record("obs_data_create")
+    return Data(source.settings) if source is not None else Data()
+
+
+def obs_source_update(source, settings):
+    _record("obs_source_update")
+    if source is not None:
+        source.settings.update(settings)
+
+
+def obs_source_get_filter_by_name(source, name):
+    _record("obs_source_get_filter_by_name")
+    if source is None:
+        return None
+    return source.filters.get(name)
+
+
+def obs_source_create_private(id, name, settings):
+    _record("obs_source_create_private")
+    s = Source(name, id)
+    s.settings.update(settings or {})
+    return s
+
+
+def obs_source_filter_add(source, filter):
+    _record("obs_source_filter_add")
+    source.filters[filter.name] = filter
+
+
+def obs_source_filter_remove(source, filter):
+    _record("obs_source_filter_remove")
+    if filter is not None:
+        source.filters.pop(filter.name, None)
+
+
+def obs_source_active(source):
+    return source is not None and source.active
+
+
+def obs_source_showing(source):
+    return source is not None and source.showing
+
+
+def __getattr__(name):
+    if name.startswith("__"):
+        raise AttributeError(name)
+
+    def recorder(*args, **kwargs):
+        _record(name)
+
+    return recorder
+
+
+def timer_add(callback, ms):
+    _record("timer_add")
+    timers.append([callback, ms, 0])  # callback, interval, ms waited
+
+
+def timer_remove(callback):
+    _record("timer_remove")
+    for t in timers:
+        if t[0] == callback:
+            timers.remove(t)
+            return
+
+
+def remove_current_callback():
+    _record("remove_current_callback")
+    if _current[0] in timers:
+        timers.remove(_current[0])
+
+
+def run_timers(elapsed=None):
+    """fire every timer, or only those whose interval passed after elapsed ms"""
+    for t in list(timers):
+        if elapsed is not None:
+            t[2] += elapsed
+            if t[2] < t[1]:
+                continue
+            t[2] = 0
+        _current[0] = t
+        t[0]()
+    _current[0] = None
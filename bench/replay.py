@@ -0,0 +1,122 @@
+"""
+Record an effect run with the headless obspython, play a recording back or check
+that re-running it with the recorded seed gives the same ticks
+Usage: python bench/replay.py record typewriter "some text" run.json.gz [--seed 1]
+           [--set easing=linear --set window_size=2 ...]
+       python bench/replay.py play run.json.gz
+       python bench/replay.py check run.json.gz
+"""
+import argparse
+
+from bench_effects import SimulatedClock, obs, scripted_text
+
+
+def setup(refresh_rate):
+    obs.reset()
+    scripted_text.source_cache.invalidate()
+    scripted_text.scene_index.invalidate()
+    obs.add_source("bench text")
+    obs.add_scene("bench scene", "bench text")
+    clock = scripted_text.monotonic = SimulatedClock()
+    driver = scripted_text.Driver()
+    driver.source_name = "bench text"
+    driver.refresh_rate = refresh_rate
+    return driver, clock
+
+
+def ticks(driver, clock):
+    """state of text source after every tick of triggered driver"""
+    source = obs.sources["bench text"]
+    item = source.items[0]
+    driver.hotkey_hook()
+    while True:
+        clock.advance(driver.refresh_rate)
+        obs.run_timers(driver.refresh_rate)
+        filters = {k: dict(v.settings) for k, v in sorted(source.filters.items())}
+        yield dict(source.settings), filters, (item.pos.x, item.pos.y)
+        if driver.lock:
+            break
+
+
+def parse_setting(option):
+    """name=value of a recorded setting, typed like the driver's default"""
+    name, _, value = option.partition("=")
+    if name not in scripted_text.Recording.settings:
+        raise argparse.ArgumentTypeError(f"not a recorded setting: {name}")
+    default = getattr(scripted_text.Driver(), name)
+    if isinstance(default, bool):
+        return name, value.lower() in ("1", "true", "yes")
+    return name, type(default)(value)
+
+
+def record(effect, text, seed, refresh_rate, duration, settings=None):
+    driver, clock = setup(refresh_rate)
+    driver.effect = effect
+    driver.scripted_text = text
+    driver.seed = seed
+    driver.effect_duration = duration
+    for name, value in (settings or {}).items():
+        setattr(driver, name, value)
+    driver.record = True
+    states = list(ticks(driver, clock))
+    return driver.recording, states
+
+
+def play(recording):
+    driver, clock = setup(recording.header["refresh_rate"])
+    driver.effect = "replay"
+    driver.replay_recording = recording
+    driver.effect_duration = recording.header["duration"]
+    return list(ticks(driver, clock))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+    rec = commands.add_parser("record")
+    rec.add_argument("effect")
+    rec.add_argument("text")
+    rec.add_argument("path")
+    rec.add_argument("--seed", type=int, default=1)
+    rec.add_argument("--refresh-rate", type=int, default=100)
+    rec.add_argument("--duration", type=int, default=3000, help="ms")
+    rec.add_argument(
+        "--set", type=parse_setting, action="append", default=[], metavar="NAME=VALUE"
+    )
+    for name in ("play", "check"):
+        commands.add_parser(name).add_argument("path")
+    args = parser.parse_args()
+
+    scripted_text.effects.discover()  # plugin effects, as script_load does
+    if args.command == "record":
+        recording, states = record(
+            args.effect,
+            args.text,
+            args.seed,
+            args.refresh_rate,
+            args.duration,
+            dict(args.set),
+        )
+        recording.save(args.path)
+    else:
+        recording = scripted_text.Recording.load(args.path)
+        states = play(recording)
+    if args.command == "check":
+        header = recording.header
+        _, expected = record(
+            header["effect"],
+            header["text"],
+            header["seed"],
+            header["refresh_rate"],
+            header["duration"],
+            header.get("settings"),
+        )
+        same = expected == states
+        print("replay matches re-run" if same else "replay differs from re-run")
+        raise SystemExit(0 if same else 1)
+    for i, (settings, filters, pos) in enumerate(states):
+        print(i, settings, filters, pos)
+
+
+if __name__ == "__main__":
+    main()
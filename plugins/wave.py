@@ -0,0 +1,16 @@
+"""
+Example effect plugin, files of this folder are imported only when selected
+"""
+from scripted_text import Effect
+
+
+class Wave(Effect):
+    "one letter at time goes upper case, moving along the text"
+    name = "wave"
+
+    def tick(self):
+        text = self.driver.input_text
+        if text:
+            i = self.driver.tick_index % len(text)
+            text = text[:i] + text[i].upper() + text[i + 1 :]
+        self.driver.update_text(text)
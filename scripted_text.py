@@ -9,38 +9,30 @@ __author__ = "upgradeQ"
 __version__ = "1.0.0"
 __licence__ = "MPL-2.0"
 
+import os
+import gzip
+import json
+import select
+import socket
+import stat
 import string
+import threading
+import importlib.util
 import obspython as obs
 from ast import literal_eval
-from itertools import cycle
+from bisect import bisect_left, bisect_right
+from collections import Counter, deque
 from functools import partial
-from random import choice, randrange
+from random import Random
 from contextlib import contextmanager
 from pathlib import Path
-from random import seed
-from datetime import timedelta
+from time import monotonic, perf_counter, strftime
+from math import ceil, cos, inf, pi
 from string import Template
+from types import MappingProxyType
 
 
-# auto release context managers
-@contextmanager
-def source_ar(source_name):
-    source = obs.obs_get_source_by_name(source_name)
-    try:
-        yield source
-    finally:
-        obs.obs_source_release(source)
-
-
-@contextmanager
-def p_source_ar(id, source_name, settings):
-    try:
-        _source = obs.obs_source_create_private(id, source_name, settings)
-        yield _source
-    finally:
-        obs.obs_source_release(_source)
-
-
+# auto release context manager
 @contextmanager
 def data_ar(source_settings=None):
     if not source_settings:
@@ -53,138 +45,1769 @@ def data_ar(source_settings=None):
         obs.obs_data_release(settings)
 
 
-@contextmanager
-def scene_ar(scene):
-    scene = obs.obs_scene_from_source(scene)
-    try:
-        yield scene
-    finally:
-        obs.obs_scene_release(scene)
+obs_ops = Counter()  # obs calls made by ticks: update, lookup, filter
 
 
-@contextmanager
-def filter_ar(source, name):
-    source = obs.obs_source_get_filter_by_name(source, name)
-    try:
-        yield source
-    finally:
-        obs.obs_source_release(source)
+class SourceCache:
+    """holds a strong reference for each source name, so ticks skip name lookups"""
+
+    signals = ("source_rename", "source_remove", "source_destroy")
+
+    def __init__(self):
+        self._sources = {}
+        self._types = {}
+        self._settings = {}
+        self._stale = deque()  # names from signals, released by next tick
+        self.connected = False
+
+    def get(self, source_name):
+        if not source_name:
+            return None
+        try:
+            return self._sources[source_name]
+        except KeyError:
+            pass
+        obs_ops["lookup"] += 1
+        source = obs.obs_get_source_by_name(source_name)
+        if source is None:
+            return None
+        self._sources[source_name] = source
+        self._types[source_name] = obs.obs_source_get_unversioned_id(source)
+        self._settings[source_name] = obs.obs_data_create()
+        return source
+
+    def source_type(self, source_name):
+        self.get(source_name)
+        return self._types.get(source_name)
+
+    def settings(self, source_name):
+        """reusable obs_data for updates of this source"""
+        self.get(source_name)
+        return self._settings.get(source_name)
+
+    def invalidate(self, source_name=None):
+        if source_name is None:
+            self._stale.clear()
+        names = list(self._sources) if source_name is None else [source_name]
+        for name in names:
+            source = self._sources.pop(name, None)
+            if source is None:
+                continue
+            self._types.pop(name, None)
+            obs.obs_data_release(self._settings.pop(name))
+            obs.obs_source_release(source)
+
+    def release_stale(self):
+        """on the tick thread, a tick may still use what signals dropped"""
+        while self._stale:
+            self.invalidate(self._stale.popleft())
+
+    def on_source_signal(self, calldata):
+        source = obs.calldata_source(calldata, "source")
+        self._stale.append(obs.obs_source_get_name(source))
+        prev_name = obs.calldata_string(calldata, "prev_name")
+        if prev_name:
+            self._stale.append(prev_name)
+
+    def connect(self):
+        if self.connected:
+            return
+        handler = obs.obs_get_signal_handler()
+        for signal in self.signals:
+            obs.signal_handler_connect(handler, signal, self.on_source_signal)
+        self.connected = True
+
+    def disconnect(self):
+        if self.connected:
+            handler = obs.obs_get_signal_handler()
+            for signal in self.signals:
+                obs.signal_handler_disconnect(handler, signal, self.on_source_signal)
+            self.connected = False
+        self.invalidate()
+
+
+source_cache = SourceCache()
+
+
+class SourceCatalog:
+    """source names for settings lists grouped by kind, kept in sync by signals"""
+
+    signals = {
+        "source_create": "on_create",
+        "source_remove": "on_remove",
+        "source_destroy": "on_remove",
+        "source_rename": "on_rename",
+    }
+    text_ids = ("text_gdiplus", "text_ft2_source")
+
+    def __init__(self):
+        self._kinds = {}  # name -> kinds, in enumeration order
+        self.built = False
+        self.connected = False
+
+    def kinds(self, source):
+        if obs.obs_source_get_type(source) == obs.OBS_SOURCE_TYPE_SCENE:
+            # layered scene source, groups are skipped
+            if obs.obs_source_get_unversioned_id(source) == "scene":
+                return ("layer",)
+            return ()
+        if obs.obs_source_get_type(source) != obs.OBS_SOURCE_TYPE_INPUT:
+            return ()
+        # exclude Desktop Audio and Mic/Aux by their capabilities
+        capability_flags = obs.obs_source_get_output_flags(source)
+        if capability_flags & obs.OBS_SOURCE_DO_NOT_SELF_MONITOR:
+            return ()
+        if capability_flags == obs.OBS_SOURCE_AUDIO | obs.OBS_SOURCE_DO_NOT_DUPLICATE:
+            return ()
+        source_id = obs.obs_source_get_unversioned_id(source)
+        kinds = ("text",) if source_id in self.text_ids else ()
+        if source_id == "ffmpeg_source":
+            return kinds + ("sound",)
+        return kinds + ("layer",)
+
+    def add(self, source):
+        kinds = self.kinds(source)
+        if kinds:
+            self._kinds[obs.obs_source_get_name(source)] = kinds
+
+    def build(self):
+        """full enumeration, only once, signals keep it up to date after"""
+        self._kinds = {}
+        sources = obs.obs_enum_sources()
+        if sources is not None:
+            for source in sources:
+                self.add(source)
+            obs.source_list_release(sources)
+        scenes = obs.obs_frontend_get_scenes()
+        if scenes is not None:
+            for scene in scenes:
+                self.add(scene)
+            obs.source_list_release(scenes)
+        self.built = True
+
+    def names(self, kind):
+        if not self.built:
+            self.build()
+        return [name for name, kinds in list(self._kinds.items()) if kind in kinds]
+
+    def invalidate(self):
+        self._kinds = {}
+        self.built = False
+
+    def on_create(self, calldata):
+        if self.built:
+            self.add(obs.calldata_source(calldata, "source"))
+
+    def on_remove(self, calldata):
+        source = obs.calldata_source(calldata, "source")
+        self._kinds.pop(obs.obs_source_get_name(source), None)
+
+    def on_rename(self, calldata):
+        kinds = self._kinds.pop(obs.calldata_string(calldata, "prev_name"), None)
+        if kinds:
+            self._kinds[obs.calldata_string(calldata, "new_name")] = kinds
+
+    def connect(self):
+        if self.connected:
+            return
+        handler = obs.obs_get_signal_handler()
+        for signal, method in self.signals.items():
+            obs.signal_handler_connect(handler, signal, getattr(self, method))
+        self.connected = True
+
+    def disconnect(self):
+        if self.connected:
+            handler = obs.obs_get_signal_handler()
+            for signal, method in self.signals.items():
+                obs.signal_handler_disconnect(handler, signal, getattr(self, method))
+            self.connected = False
+        self.invalidate()
+
+
+source_catalog = SourceCatalog()
+
+
+class SceneItemIndex:
+    """scene items by (scene name, source name), dropped on scene and item changes"""
+
+    item_signals = ("item_add", "item_remove")
+
+    def __init__(self):
+        self._scenes = {}  # scene name -> scene source, connected to item signals
+        self._items = {}
+        self._scene_names = None
+        self._current_scene = None
+        self._stale = False  # items changed, released by next tick
+
+    def scene(self, scene_name):
+        try:
+            return self._scenes[scene_name]
+        except KeyError:
+            pass
+        source = obs.obs_get_source_by_name(scene_name)
+        if source is None:
+            return None
+        handler = obs.obs_source_get_signal_handler(source)
+        for signal in self.item_signals:
+            obs.signal_handler_connect(handler, signal, self.on_item_signal)
+        self._scenes[scene_name] = source
+        return source
+
+    def find(self, scene_name, source_name):
+        key = (scene_name, source_name)
+        try:
+            return self._items[key]
+        except KeyError:
+            pass
+        obs_ops["lookup"] += 1
+        scene = obs.obs_scene_from_source(self.scene(scene_name))  # not addref'd
+        item = obs.obs_scene_find_source_recursive(scene, source_name)
+        if item is not None:
+            obs.obs_sceneitem_addref(item)
+        self._items[key] = item
+        return item
+
+    @property
+    def current_scene(self):
+        if self._current_scene is None:
+            source = obs.obs_frontend_get_current_scene()
+            self._current_scene = obs.obs_source_get_name(source)
+            obs.obs_source_release(source)
+        return self._current_scene
+
+    @property
+    def scene_names(self):
+        if self._scene_names is None:
+            self._scene_names = obs.obs_frontend_get_scene_names() or []
+        return self._scene_names
+
+    def items_of(self, source_name, all_scenes=False):
+        """[(scene name, scene item)] showing source_name"""
+        names = self.scene_names if all_scenes else [self.current_scene]
+        items = [(i, self.find(i, source_name)) for i in names]
+        return [i for i in items if i[1] is not None]
+
+    def invalidate(self):
+        for item in self._items.values():
+            if item is not None:
+                obs.obs_sceneitem_release(item)
+        self._items.clear()
+        for source in self._scenes.values():
+            handler = obs.obs_source_get_signal_handler(source)
+            for signal in self.item_signals:
+                obs.signal_handler_disconnect(handler, signal, self.on_item_signal)
+            obs.obs_source_release(source)
+        self._scenes.clear()
+        self._scene_names = self._current_scene = None
+        self._stale = False
+
+    def on_scene_changed(self):
+        self._current_scene = None
+
+    def release_stale(self):
+        """on the tick thread, a tick may still use items signals dropped"""
+        if not self._stale:
+            return
+        self._stale = False
+        for item in self._items.values():
+            if item is not None:
+                obs.obs_sceneitem_release(item)
+        self._items.clear()
+
+    def on_item_signal(self, calldata):
+        self._stale = True
+
+
+scene_index = SceneItemIndex()
+
+
+class FrameTable:
+    """immutable frames of a deterministic effect, indexed by tick"""
+
+    __slots__ = ("source_text", "frames", "loop")
+
+    def __init__(self, source_text, frames, loop=False):
+        self.source_text = source_text
+        if not isinstance(frames, SliceFrames):
+            frames = tuple(frames) or ("",)
+        self.frames = frames
+        self.loop = loop
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __getitem__(self, index):
+        """looped tables wrap around, others hold the last frame"""
+        if self.loop:
+            return self.frames[index % len(self.frames)]
+        return self.frames[min(index, len(self.frames) - 1)]
+
+
+class SliceFrames:
+    """frames cut from one text, sliced when shown instead of stored,
+    (start, end, width) per frame"""
+
+    __slots__ = ("text", "cuts")
+
+    def __init__(self, text, cuts):
+        self.text = text
+        self.cuts = cuts
+
+    def __len__(self):
+        return len(self.cuts)
+
+    def __getitem__(self, index):
+        start, end, width = self.cuts[index]
+        return self.text[start:end].ljust(width)
+
+
+class TextWindow:
+    """viewport of size lines or chars around a cursor, line starts built once"""
+
+    __slots__ = ("text", "size", "unit", "starts")
+
+    def __init__(self, text, size, unit="lines"):
+        self.text = text
+        self.size = max(1, size)
+        self.unit = unit
+        self.starts = [0]
+        i = text.find("\n")
+        while i != -1:
+            self.starts.append(i + 1)
+            i = text.find("\n", i + 1)
+
+    def line_of(self, offset):
+        return bisect_right(self.starts, offset) - 1
+
+    def line_end(self, line):
+        """offset of line's end, without newline"""
+        if line + 1 < len(self.starts):
+            return self.starts[line + 1] - 1
+        return len(self.text)
+
+    def view(self, cursor):
+        """(start, end) of viewport holding cursor offset, cursor line is last"""
+        if self.unit == "chars":
+            # room for the char at cursor, none past the end
+            start = max(0, min(cursor + 1, len(self.text)) - self.size)
+            return start, min(len(self.text), start + self.size)
+        line = self.line_of(cursor)
+        return self.starts[max(0, line - self.size + 1)], self.line_end(line)
+
+    def page(self, index):
+        """index-th viewport when scrolling one line or char at time, wraps"""
+        if self.unit == "chars":
+            start = index % max(1, len(self.text))
+            return self.text[start : start + self.size]
+        first = index % len(self.starts)
+        last = min(first + self.size, len(self.starts)) - 1
+        return self.text[self.starts[first] : self.line_end(last)]
+
+
+SCRAMBLE_CHARS = string.digits + string.ascii_letters + string.punctuation
+
+
+class ScrambleStream:
+    """frames of random chars revealing, built one at time
+    inspired by https://github.com/etienne-napoleone/scrmbl """
+
+    def __init__(
+        self, text, iterations=3, chars=SCRAMBLE_CHARS, rng_seed=None, window=None
+    ):
+        self.text = text
+        self.window = window  # TextWindow, frames only span its viewport
+        self.iterations = max(1, iterations)
+        self.chars = chars or SCRAMBLE_CHARS
+        self.random = Random(rng_seed)
+        self.position = self.step = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        position = self.position
+        if position >= len(self.text):
+            if self.window is None:
+                return self.text
+            start, end = self.window.view(len(self.text) - 1)
+            return self.text[start:end]
+        char = self.text[position]
+        if char != " ":
+            char = self.random.choice(self.chars)
+        if self.window is None:
+            start, end = 0, len(self.text)
+        else:
+            start, end = self.window.view(position)
+        frame = self.text[start:position] + char + " " * (end - position - 1)
+        self.advance(1)
+        return frame
+
+    def advance(self, steps):
+        """skip frames without building them"""
+        self.step += steps
+        self.position += self.step // self.iterations
+        self.step %= self.iterations
+
+
+class WatchedFile:
+    """text of a file, loaded by file_worker and published as one snapshot"""
+
+    def __init__(self, path="", follow=True):
+        self.path = path
+        self.follow = follow  # keep re-reading on changes
+        self.snapshot = None  # (signature, text), replaced as a whole
+        self.error = None
+        self.read_ms = self.max_read_ms = 0  # latency of last/slowest read
+        self.checked_at = None  # clock() of last successful check
+
+    @property
+    def text(self):
+        """never touches the disk, safe in ticks"""
+        snapshot = self.snapshot
+        if snapshot is None:
+            return "error" if self.error else ""
+        return snapshot[1]
+
+    @property
+    def staleness(self):
+        """ms since content was last confirmed up to date"""
+        if self.checked_at is None:
+            return None
+        return clock() - self.checked_at
+
+    def describe(self):
+        if self.error:
+            return f"file: {self.error}"
+        staleness = self.staleness
+        if staleness is None:
+            return "file: not read yet"
+        return (
+            f"file: read in {self.read_ms:.1f}ms (max {self.max_read_ms:.1f}ms), "
+            f"checked {staleness:.0f}ms ago"
+        )
+
+    def refresh(self):
+        """worker thread only, re-reads when modification time or size changed"""
+        try:
+            started = clock()
+            info = os.stat(self.path)
+            signature = (info.st_mtime_ns, info.st_size)
+            snapshot = self.snapshot
+            if snapshot is None or snapshot[0] != signature:
+                with open(self.path, "rb") as f:
+                    text = f.read().decode("utf-8")
+                self.snapshot = (signature, text)
+                self.read_ms = clock() - started
+                self.max_read_ms = max(self.max_read_ms, self.read_ms)
+            self.checked_at = clock()
+            self.error = None
+        except Exception as e:
+            if str(e) != self.error:  # report once, not every check
+                print("error reading file", e)
+                self.error = str(e)
+
+
+class FileWorker:
+    """background thread loading watched files, so ticks never wait for disk"""
+
+    def __init__(self, interval=0.25):
+        self.interval = interval  # seconds between checks of followed files
+        self.files = []
+        self.wake = threading.Event()
+        self.stopping = False
+        self.thread = None
+
+    def watch(self, watched):
+        if watched not in self.files:
+            self.files = self.files + [watched]  # swapped, worker iterates a copy
+        if self.thread is None:
+            self.stopping = False
+            self.thread = threading.Thread(
+                target=self.run, name="scripted text files", daemon=True
+            )
+            self.thread.start()
+        self.wake.set()
+
+    def unwatch(self, watched):
+        self.files = [i for i in self.files if i is not watched]
+
+    def run(self):
+        while not self.stopping:
+            for watched in self.files:
+                watched.refresh()
+                if not watched.follow and watched.snapshot is not None:
+                    self.unwatch(watched)  # read once
+            self.wake.wait(self.interval)
+            self.wake.clear()
+
+    def stop(self):
+        self.stopping = True
+        self.wake.set()
+        if self.thread is not None:
+            self.thread.join(1)
+        self.thread = None
+        self.files = []
+
+
+file_worker = FileWorker()
+
+
+class Message:
+    """queued text, shown with its own effect and duration(ms), None = slot's"""
+
+    __slots__ = ("text", "effect", "duration")
+
+    def __init__(self, text, effect=None, duration=None):
+        self.text = text
+        self.effect = effect
+        self.duration = duration
+
+
+def parse_message(line):
+    """plain text line or json {"text": "hi", "effect": "fade", "duration": 3}"""
+    line = line.rstrip("\r\n")
+    if line.startswith("{"):
+        try:
+            data = json.loads(line)
+            duration = data.get("duration")
+            return Message(
+                str(data.get("text", "")),
+                data.get("effect") or None,
+                1000 * float(duration) if duration else None,
+            )
+        except (ValueError, TypeError, AttributeError) as e:
+            print("bad queue message", e)
+    return Message(line) if line.strip() else None
+
+
+QUEUE_POLICIES = ("drop_oldest", "drop_newest", "merge", "block")
+
+
+class MessageQueue:
+    """bounded queue between reader thread and ticks, pop never blocks"""
+
+    def __init__(self, maxsize=16, policy="drop_oldest"):
+        self.messages = deque()
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self.not_full = threading.Condition()
+        self.dropped = self.merged = 0
+        self.on_push = None  # called from reader thread after a push
+
+    def __len__(self):
+        return len(self.messages)
+
+    def push(self, message, stopping=None):
+        """from reader thread, "block" policy waits there until a slot is free"""
+        with self.not_full:
+            if len(self.messages) >= self.maxsize:
+                if self.policy == "block":
+                    while len(self.messages) >= self.maxsize:
+                        if stopping is not None and stopping.is_set():
+                            return False
+                        self.not_full.wait(0.25)
+                elif self.policy == "drop_newest":
+                    self.dropped += 1
+                    return False
+                elif self.policy == "merge" and self.can_merge(message):
+                    # burst of same effect becomes one message, ; separated
+                    last = self.messages[-1]
+                    last.text = f"{last.text};{message.text}"
+                    if message.duration:
+                        last.duration = max(last.duration or 0, message.duration)
+                    self.merged += 1
+                    return True
+                else:
+                    self.messages.popleft()
+                    self.dropped += 1
+            self.messages.append(message)
+        if self.on_push is not None:
+            self.on_push()
+        return True
+
+    def can_merge(self, message):
+        return self.messages[-1].effect == message.effect
+
+    def pop(self):
+        if not self.messages:  # idle ticks skip the lock
+            return None
+        with self.not_full:
+            message = self.messages.popleft() if self.messages else None
+            self.not_full.notify()
+            return message
+
+
+class QueueReader:
+    """worker thread feeding a queue from a file, named pipe or tcp:PORT"""
+
+    def __init__(self, spec, queue):
+        self.spec = spec
+        self.queue = queue
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(
+            target=self.run, name=f"scripted text queue {spec}", daemon=True
+        )
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        """never waits, thread ends within its next 0.25s poll"""
+        self.queue.on_push = None
+        self.stopping.set()
+
+    def run(self):
+        try:
+            if self.spec.startswith("tcp:"):
+                self.serve(int(self.spec[4:]))
+            elif self.is_pipe():
+                self.read_pipe()
+            else:
+                self.follow_file()
+        except Exception as e:
+            print("queue reader error", e)
+
+    def is_pipe(self):
+        try:
+            return stat.S_ISFIFO(os.stat(self.spec).st_mode)
+        except OSError:
+            return False  # not created yet, followed as file
+
+    def feed(self, line):
+        if self.stopping.is_set():
+            return  # queue was dropped
+        message = parse_message(line.decode("utf-8", "replace"))
+        if message is not None:
+            self.queue.push(message, self.stopping)
+
+    def follow_file(self):
+        """every line, then lines appended later, restarts if file is rewritten,
+        a missing or rotated file is retried on next poll"""
+        position = 0
+        while not self.stopping.is_set():
+            try:
+                size = os.path.getsize(self.spec)
+                if size < position:
+                    position = 0
+                if size > position:
+                    with open(self.spec, "rb") as f:
+                        f.seek(position)
+                        for line in iter(f.readline, b""):
+                            if not line.endswith(b"\n"):
+                                break  # partially written, next time
+                            position += len(line)
+                            self.feed(line)
+            except OSError:
+                position = 0  # read again from start once it's back
+            self.stopping.wait(0.25)
+
+    def read_pipe(self):
+        """non-blocking reads, so stop is seen even while a writer is connected"""
+        while not self.stopping.is_set():
+            try:
+                fd = os.open(self.spec, os.O_RDONLY | os.O_NONBLOCK)
+            except OSError:
+                self.stopping.wait(0.25)
+                continue
+            try:
+                pending = b""
+                while not self.stopping.is_set():
+                    if not select.select([fd], [], [], 0.25)[0]:
+                        continue
+                    chunk = os.read(fd, 4096)
+                    if not chunk:  # no writer left
+                        break
+                    *lines, pending = (pending + chunk).split(b"\n")
+                    for line in lines:
+                        self.feed(line)
+                if pending:
+                    self.feed(pending)
+            except OSError:
+                pass
+            finally:
+                os.close(fd)
+            self.stopping.wait(0.25)
+
+    def serve(self, port):
+        """local socket, one client at time, a message per line"""
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server:
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            while True:
+                try:
+                    server.bind(("127.0.0.1", port))
+                    break
+                except OSError:  # reader being replaced still listens
+                    if self.stopping.wait(0.25):
+                        return
+            server.listen()
+            server.settimeout(0.25)
+            while not self.stopping.is_set():
+                try:
+                    conn, _ = server.accept()
+                except socket.timeout:
+                    continue
+                with conn:
+                    conn.settimeout(0.25)
+                    pending = b""
+                    while not self.stopping.is_set():
+                        try:
+                            chunk = conn.recv(4096)
+                        except socket.timeout:
+                            continue
+                        if not chunk:
+                            break
+                        *lines, pending = (pending + chunk).split(b"\n")
+                        for line in lines:
+                            self.feed(line)
+
+
+EASINGS = {
+    "linear": lambda t: t,
+    "ease_in": lambda t: t * t,
+    "ease_out": lambda t: t * (2 - t),
+    "ease_in_out": lambda t: 2 * t * t if t < 0.5 else 1 - (2 - 2 * t) ** 2 / 2,
+    "sine": lambda t: (1 - cos(pi * t)) / 2,
+}
+
+
+def lerp(a, b, k):
+    if isinstance(a, tuple):
+        return tuple(i + (j - i) * k for i, j in zip(a, b))
+    return a + (b - a) * k
+
+
+def gradient(colors, steps):
+    """steps colors from each palette entry towards the next one, wrapping"""
+    if steps <= 1 or len(colors) < 2:
+        return list(colors)
+    blended = []
+    for a, b in zip(colors, colors[1:] + colors[:1]):
+        for i in range(steps):
+            blended.append(
+                sum(
+                    round(lerp((a >> shift) & 0xFF, (b >> shift) & 0xFF, i / steps))
+                    << shift
+                    for shift in (0, 8, 16)
+                )
+            )
+    return blended
+
+
+def native_color(color, source_type):
+    """0xBBGGRR as gdi+ text takes it, freetype2 wants opaque 0xAABBGGRR"""
+    if source_type == "text_gdiplus":
+        return color
+    return 0xFF000000 | color
+
+
+class Tween:
+    """value interpolated between keyframes (ms since start, value), eased per segment"""
+
+    def __init__(self, keyframes, easing="linear"):
+        self.keyframes = sorted(keyframes, key=lambda i: i[0])
+        self.times = [i[0] for i in self.keyframes]
+        self.ease = EASINGS.get(easing, EASINGS["linear"])
+
+    def __call__(self, time):
+        index = bisect_right(self.times, time)
+        if index == 0:
+            return self.keyframes[0][1]
+        if index == len(self.keyframes):
+            return self.keyframes[-1][1]
+        (t0, v0), (t1, v1) = self.keyframes[index - 1], self.keyframes[index]
+        return lerp(v0, v1, self.ease((time - t0) / (t1 - t0)))
+
+
+def format_clock(ms):
+    seconds = int(ms // 1000)
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+def countdown_bar(remaining, total, width=20):
+    filled = round(width * remaining / total) if total else 0
+    return "\u2588" * filled + "\u2591" * (width - filled)
+
+
+# placeholder -> value from (remaining ms, elapsed ms, total ms)
+PLACEHOLDERS = {
+    "s": lambda r, e, t: int(r // 1000),
+    "cs": lambda r, e, t: f"{int(r % 1000) // 10:02d}",
+    "ms": lambda r, e, t: f"{int(r % 1000):03d}",
+    "h": lambda r, e, t: int(r // 3600000),
+    "m": lambda r, e, t: int(r // 60000),
+    "mm": lambda r, e, t: f"{int(r // 60000) % 60:02d}",
+    "ss": lambda r, e, t: f"{int(r // 1000) % 60:02d}",
+    "remaining": lambda r, e, t: format_clock(r),
+    "elapsed": lambda r, e, t: format_clock(e),
+    "pc": lambda r, e, t: f"{100 * r / t if t else 0:.2f}%",
+    "bar": lambda r, e, t: countdown_bar(r, t),
+}
+TEMPLATE_EFFECTS = ("timer", "percent")
+
+
+class CompiledTemplate:
+    """$placeholders of scripted text parsed once into a format string"""
+
+    def __init__(self, text):
+        self.text = text
+        self.error = None
+        self.reported = False
+        self.names = []
+        parts = []
+        position = 0
+        escape = lambda i: i.replace("{", "{{").replace("}", "}}")
+        for match in Template.pattern.finditer(text):
+            parts.append(escape(text[position : match.start()]))
+            position = match.end()
+            name = match.group("named") or match.group("braced")
+            if match.group("escaped") is not None:
+                parts.append("$")
+            elif name in PLACEHOLDERS:
+                parts.append("{" + name + "}")
+                if name not in self.names:
+                    self.names.append(name)
+            elif name is not None:
+                self.error = f"unknown placeholder ${name}"
+            elif self.error is None:
+                line = text.count("\n", 0, match.start()) + 1
+                self.error = f"invalid placeholder on line {line}"
+        parts.append(escape(text[position:]))
+        self.format = "".join(parts).format_map
+
+    def render(self, remaining, elapsed, total):
+        if self.error:
+            return self.text
+        return self.format(
+            {i: PLACEHOLDERS[i](remaining, elapsed, total) for i in self.names}
+        )
+
+
+def parse_chain(effect):
+    """ "typewriter | rainbow | fade" -> ["typewriter", "rainbow", "fade"]"""
+    return [i.strip() for i in effect.split("|") if i.strip()] or [""]
+
+
+def tremor_jumps(rng):
+    """offsets in range(-100,100) without zero"""
+    while True:
+        yield rng.randrange(1, 101) * rng.choice((-1, 1))
+
+
+def clock():
+    """monotonic time in ms"""
+    return monotonic() * 1000
+
+
+def frame_interval():
+    """ms per video frame of obs video settings, 30 fps if unknown"""
+    info = obs.obs_video_info()
+    if obs.obs_get_video_info(info) and info.fps_num:
+        return 1000 * info.fps_den / info.fps_num
+    return 1000 / 30
+
+
+class Scheduler:
+    """one obs timer shared by every effect slot
+
+    hotkeys, buttons, reader threads and signals wake slots from other
+    threads than ticks, so timer and slot list only change under lock"""
+
+    def __init__(self):
+        self.drivers = []
+        self.interval = None
+        self.callback = self.tick  # same object for timer_add and timer_remove
+        self.lock = threading.RLock()
+        self.ticking = False
+        self.last_tick = None
+        self.jitter = self.max_jitter = 0  # ms between expected and real callback
+        self.frame = 0  # video frames seen by frame_tick
+
+    def add(self, driver):
+        with self.lock:
+            if driver not in self.drivers:
+                self.drivers.append(driver)
+            if not self.ticking:
+                self.retime()
+
+    def remove(self, driver):
+        with self.lock:
+            if driver in self.drivers:
+                self.drivers.remove(driver)
+            if not self.ticking:
+                self.retime()
+
+    def sleep(self, driver, until=inf):
+        """no ticks for driver until clock() reaches until, or it is woken"""
+        with self.lock:
+            driver.wake_at = until
+            if not self.ticking:
+                self.retime()
+
+    def wake(self, driver):
+        with self.lock:
+            if driver.wake_at:
+                driver.wake_at = 0
+                if not self.ticking:
+                    self.retime()
+
+    def retime(self):
+        """timer runs at the fastest refresh rate among awake slots,
+        only to wake the first sleeping one otherwise, removed if none"""
+        with self.lock:
+            now = clock()
+            timed = [i for i in self.drivers if not i.refresh_frames]
+            interval = min(
+                (i.refresh_rate for i in timed if i.wake_at <= now), default=None
+            )
+            if interval is None:
+                wake_at = min((i.wake_at for i in timed), default=inf)
+                if wake_at != inf:
+                    interval = max(1, ceil(wake_at - now))
+            if interval == self.interval:
+                return
+            if self.interval is not None:
+                obs.timer_remove(self.callback)
+            if interval is not None:
+                obs.timer_add(self.callback, interval)
+            self.interval = interval
+            self.last_tick = None
+
+    def begin_tick(self):
+        """slots of this tick, other threads leave retime to end_tick"""
+        source_cache.release_stale()
+        scene_index.release_stale()
+        with self.lock:
+            self.ticking = True
+            return list(self.drivers)
+
+    def end_tick(self):
+        with self.lock:
+            self.ticking = False
+            self.retime()
+
+    def run(self, driver):
+        """tick of one slot, an error stops that slot's run and no other slot"""
+        try:
+            driver.ticker()
+        except Exception as e:
+            print(f"scripted text slot {driver.index + 1} stopped:", repr(e))
+            if not driver.lock:
+                try:
+                    driver.stop()
+                except Exception as e:
+                    print(f"scripted text slot {driver.index + 1}:", repr(e))
+                    driver.lock = True
+                    self.remove(driver)
+
+    def tick(self):
+        """drivers compute their frame from clock, so every slot is offered a tick"""
+        now = clock()
+        with self.lock:
+            if self.last_tick is not None and self.interval is not None:
+                self.jitter = abs(now - self.last_tick - self.interval)
+                self.max_jitter = max(self.max_jitter, self.jitter)
+            self.last_tick = now
+            drivers = self.begin_tick()
+        try:
+            for driver in drivers:
+                if driver.wake_at <= now and not driver.refresh_frames:
+                    self.run(driver)
+        finally:
+            self.end_tick()
+
+    def frame_tick(self):
+        """once per video frame, ticks slots whose refresh rate is in frames"""
+        self.frame += 1
+        due = [
+            i
+            for i in list(self.drivers)
+            if i.refresh_frames and self.frame >= i.next_frame
+        ]
+        if not due:
+            return
+        now = clock()
+        self.begin_tick()
+        try:
+            for driver in due:
+                if driver.wake_at <= now:
+                    driver.next_frame = self.frame + driver.refresh_frames
+                    self.run(driver)
+        finally:
+            self.end_tick()
+
+
+scheduler = Scheduler()
+
+PROFILE_BOUNDS = (  # us
+    10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000
+)
+
+
+class Histogram:
+    """durations in microseconds, bucketed by PROFILE_BOUNDS"""
+
+    __slots__ = ("counts", "n", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(PROFILE_BOUNDS) + 1)
+        self.n = 0
+        self.max = 0
+
+    def add(self, us):
+        self.counts[bisect_left(PROFILE_BOUNDS, us)] += 1
+        self.n += 1
+        self.max = max(self.max, us)
+
+    def percentile(self, q):
+        """upper bound of bucket holding q-th quantile"""
+        rank = q * self.n
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return PROFILE_BOUNDS[i] if i < len(PROFILE_BOUNDS) else self.max
+        return 0
+
+
+class TickProfile:
+    """one run: duration histograms of whole ticks and of each effect stage"""
+
+    columns = (
+        "frame",
+        "us",
+        "lateness_ms",
+        "skipped",
+        "updates",
+        "lookups",
+        "filter_ops",
+    )
+    op_kinds = ("update", "lookup", "filter")
+
+    def __init__(self, name, max_rows=10000):
+        self.name = name
+        self.histograms = {"tick": Histogram()}
+        self.rows = deque(maxlen=max_rows)
+        self.ops = Counter()
+        self.skipped = 0
+        self.max_lateness = 0
+
+    def ops_snapshot(self):
+        return [obs_ops[i] for i in self.op_kinds]
+
+    def add(self, name, seconds):
+        if name not in self.histograms:
+            self.histograms[name] = Histogram()
+        self.histograms[name].add(seconds * 1e6)
+
+    def add_tick(self, frame, seconds, lateness, skipped, ops_before):
+        self.add("tick", seconds)
+        ops = [j - i for i, j in zip(ops_before, self.ops_snapshot())]
+        self.ops.update(dict(zip(self.op_kinds, ops)))
+        self.skipped += skipped
+        self.max_lateness = max(self.max_lateness, abs(lateness))
+        us = round(seconds * 1e6)
+        self.rows.append((frame, us, round(lateness, 2), skipped, *ops))
+
+    def summary(self):
+        ticks = self.histograms["tick"].n or 1
+        return {
+            "effect": self.name,
+            "ticks": self.histograms["tick"].n,
+            "skipped_frames": self.skipped,
+            "max_lateness_ms": round(self.max_lateness, 2),
+            "ops_per_tick": {k: self.ops[k] / ticks for k in self.op_kinds},
+            "us": {
+                name: {
+                    "n": h.n,
+                    "p50": h.percentile(0.5),
+                    "p99": h.percentile(0.99),
+                    "max": round(h.max),
+                }
+                for name, h in self.histograms.items()
+            },
+        }
+
+    def describe(self):
+        summary = self.summary()
+        lines = [
+            f"<b>{summary['effect']}</b>: {summary['ticks']} ticks, "
+            f"skipped {summary['skipped_frames']}, "
+            f"max lateness {summary['max_lateness_ms']}ms"
+        ]
+        for name, us in summary["us"].items():
+            lines.append(
+                f"{name}: p50 &lt;={us['p50']}us p99 &lt;={us['p99']}us "
+                f"max {us['max']}us"
+            )
+        ops = ", ".join(f"{k} {v:.2f}" for k, v in summary["ops_per_tick"].items())
+        lines.append(f"obs calls per tick: {ops}")
+        return "<br>".join(lines)
+
+    def export(self, folder, stem):
+        """tick rows as csv, summary with histograms as json"""
+        path = Path(folder) / stem
+        try:
+            with open(path.with_suffix(".csv"), "w", encoding="utf-8") as f:
+                f.write(",".join(self.columns) + "\n")
+                for row in self.rows:
+                    f.write(",".join(map(str, row)) + "\n")
+            summary = self.summary()
+            summary["buckets_us"] = list(PROFILE_BOUNDS)
+            summary["histograms"] = {k: h.counts for k, h in self.histograms.items()}
+            with open(path.with_suffix(".json"), "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2)
+        except Exception as e:
+            print("error exporting profile", e)
+
+
+def slot_key(name, index):
+    """settings key of effect slot, first slot keeps plain names"""
+    return name if index == 0 else f"{name}_{index}"
+
+
+def data_set(settings, values):
+    for key, value in values.items():
+        if isinstance(value, str):
+            obs.obs_data_set_string(settings, key, value)
+        elif isinstance(value, bool):
+            obs.obs_data_set_bool(settings, key, value)
+        elif isinstance(value, int):
+            obs.obs_data_set_int(settings, key, value)
+        else:
+            obs.obs_data_set_double(settings, key, value)
+
+
+class WriteBuffer:
+    """changes staged during a tick, diffed against last committed values"""
+
+    def __init__(self):
+        self.staged = {}
+        self.committed = {}
+        self.handles = {}  # scene items of staged positions
+
+    def stage(self, target, key, value):
+        self.staged.setdefault(target, {})[key] = value
+
+    def changes(self):
+        """yields target and its changed values, marking them committed"""
+        staged, self.staged = self.staged, {}
+        for target, values in staged.items():
+            committed = self.committed.setdefault(target, {})
+            changed = {
+                k: v for k, v in values.items() if k not in committed or committed[k] != v
+            }
+            if changed:
+                committed.update(changed)
+                yield target, changed
+
+    def forget(self, target=None):
+        """next commit of target is pushed even if unchanged"""
+        if target is None:
+            self.committed.clear()
+            self.handles.clear()
+        else:
+            self.committed.pop(target, None)
+            self.handles.pop(target, None)
+
+
+class Recording:
+    """changes committed by one run, per tick, replayable without its effects"""
+
+    version = 1
+    settings = (  # slot settings effects read, beyond the header's own fields
+        "easing",
+        "scramble_iterations",
+        "scramble_chars",
+        "gradient_steps",
+        "window_size",
+        "window_unit",
+        "tremor_all_scenes",
+    )
+
+    def __init__(self, header):
+        self.header = header  # effect, text, seed, refresh_rate, duration, ...
+        self.ticks = []  # [tick_index, [[kind, name, values], ...]]
+
+    @property
+    def filters(self):
+        return [tuple(i) for i in self.header.get("filters", [])]
+
+    def add(self, tick_index, changes):
+        self.ticks.append([tick_index, changes])
+
+    def save(self, path):
+        data = {"version": self.version, "header": self.header, "ticks": self.ticks}
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        recording = cls(data["header"])
+        recording.ticks = data["ticks"]
+        return recording
+
+
+class FilterHandle:
+    """filter kept attached to a source for a whole effect run"""
+
+    def __init__(self, filter_id, name, defaults=None):
+        self.filter_id = filter_id
+        self.name = name
+        self.defaults = defaults or {}
+        self.source = self.filter = self.settings = None
+
+    def attach(self, source):
+        if self.filter is not None or source is None:
+            return
+        obs_ops["filter"] += 1
+        self.source = obs.obs_source_get_ref(source)
+        self.filter = obs.obs_source_get_filter_by_name(source, self.name)
+        if self.filter is None:
+            with data_ar() as settings:
+                data_set(settings, self.defaults)
+                self.filter = obs.obs_source_create_private(
+                    self.filter_id, self.name, settings
+                )
+            obs.obs_source_filter_add(source, self.filter)
+        self.settings = obs.obs_data_create()
+
+    def update(self, values):
+        if self.filter is None:
+            return
+        obs_ops["filter"] += 1
+        obs.obs_data_clear(self.settings)
+        data_set(self.settings, values)
+        obs.obs_source_update(self.filter, self.settings)
+
+    def detach(self):
+        if self.filter is None:
+            return
+        obs_ops["filter"] += 1
+        obs.obs_source_filter_remove(self.source, self.filter)
+        obs.obs_source_release(self.filter)
+        obs.obs_source_release(self.source)
+        obs.obs_data_release(self.settings)
+        self.source = self.filter = self.settings = None
+
+
+class Effect:
+    """text effect, subclass it in a file of plugins folder next to the script:
+
+        from scripted_text import Effect
+
+        class Wave(Effect):
+            "shown in effect description"
+            name = "wave"
+
+            def tick(self):
+                self.driver.update_text(self.driver.input_text.upper())
+    """
+
+    name = ""
+    params = ()  # driver settings read by the effect
+    cost = "low"  # per tick cost hint: low, medium, high
+    filters = ()  # (filter_id, filter_name, defaults) kept for the run
+
+    def __init__(self, driver):
+        self.driver = driver
+
+    def start(self):
+        """called once on trigger"""
+
+    def tick(self):
+        raise NotImplementedError
+
+    @classmethod
+    def docs(cls):
+        return cls.__doc__ or ""
+
+
+class MethodEffect(Effect):
+    """built-in effect, implemented by a Driver method"""
+
+    method = None
+
+    def tick(self):
+        self.method(self.driver)
+
+
+class EffectRegistry:
+    """effect name -> Effect class, plugins are imported on first use"""
+
+    def __init__(self, plugins_dir):
+        self.plugins_dir = plugins_dir
+        self.effects = {}
+        self.plugins = {}  # name -> path, not imported yet
+
+    def register(self, cls):
+        self.effects[cls.name] = cls
+        return cls
+
+    def discover(self):
+        """list plugin files, without importing them"""
+        self.plugins = {}
+        if not self.plugins_dir.is_dir():
+            return
+        for path in sorted(self.plugins_dir.glob("*.py")):
+            name = path.stem
+            if not name.startswith("_") and name not in self.effects:
+                self.plugins[name] = path
+
+    def names(self):
+        return list(self.effects) + list(self.plugins)
+
+    def get(self, name):
+        """Effect class, importing its plugin if needed, None if unknown"""
+        if name not in self.effects and name in self.plugins:
+            self.load_plugin(self.plugins.pop(name))
+        return self.effects.get(name)
+
+    def load_plugin(self, path):
+        spec = importlib.util.spec_from_file_location(
+            f"scripted_text_plugin_{path.stem}", path
+        )
+        module = importlib.util.module_from_spec(spec)
+        try:
+            spec.loader.exec_module(module)
+        except Exception as e:
+            print(f"error loading effect plugin {path.name}:", e)
+            return
+        for value in vars(module).values():
+            if isinstance(value, type) and issubclass(value, Effect) and value.name:
+                self.register(value)
+
+
+effects = EffectRegistry(Path(__file__).resolve().parent / "plugins")
+
+
+def builtin_effect(cost="low", params=(), filters=()):
+    """register Driver method `name_effect` as effect `name`"""
+
+    def register(method):
+        name = method.__name__[: -len("_effect")]
+        effects.register(
+            type(
+                f"{name}Effect",
+                (MethodEffect,),
+                {
+                    "name": name,
+                    "__doc__": method.__doc__,
+                    "cost": cost,
+                    "params": params,
+                    "filters": filters,
+                    "method": staticmethod(method),
+                },
+            )
+        )
+        return method
+
+    return register
 
 
 class TextContent:
     source_name = None
     text_string = ""
+    tick_index = -1
+    cache = source_cache
+    scenes = scene_index
 
     def __init__(self):
-        self.location = (0, 0)
-        self._text_chars = self._wpm_chars = []
-        self.rand_index = self.lst_index = self.wpm_index = self.lst_rev = 0
-        self.position_swap = cycle([True, False])
         self.last_jump_x = self.last_jump_y = 0
-        self.blinking = cycle([True, False])
         self.default_palette = [0xFFBE0B, 0xFB5607, 0xFF006E, 0x8338EC, 0x3A86FF]
-        self.palette = cycle(self.default_palette)
-        self.dots = cycle([" ", ".", "..", "..."])
+        self.dots = [" ", ".", "..", "..."]
+        self.buffer = WriteBuffer()
+        self.filters = {}  # name -> FilterHandle of current run
+        self.recording = None  # Recording of current run
 
     def update_text(self, scripted_text, color=None):
-        """takes scripted_text , sets its value in obs  """
-        with source_ar(self.source_name) as source, data_ar() as settings:
-            self.text_string = scripted_text
-            if color:
-                self.set_color(color, settings)
-            obs.obs_data_set_string(settings, "text", self.text_string)
-            obs.obs_source_update(source, settings)
-
-    def set_color(self, color, settings):
+        """takes scripted_text , stages its value for obs  """
+        self.text_string = scripted_text
+        if color:
+            self.set_color(color)
+        self.buffer.stage(("source", self.source_name), "text", self.text_string)
+
+    def set_color(self, color):
+        """color already in source's encoding, see native_color"""
+        target = ("source", self.source_name)
         if self._obs_source_type == "text_gdiplus":
-            obs.obs_data_set_int(settings, "color", color)  # colored text
-
-        else:  # freetype2,if taken from user input it should be reversed for getting correct color
-            if not color in self.default_palette:
-                number = "".join(reversed(hex(color)[2:]))
-            else:
-                number = "".join(hex(color)[2:])
-            color = int("0xff" f"{number}", base=16)
-            obs.obs_data_set_int(settings, "color1", color)
-            obs.obs_data_set_int(settings, "color2", color)
+            self.buffer.stage(target, "color", color)  # colored text
+        else:  # freetype2
+            self.buffer.stage(target, "color1", color)
+            self.buffer.stage(target, "color2", color)
+
+    def set_filter(self, filter_name, key, value):
+        self.buffer.stage(("filter", filter_name), key, value)
+
+    def set_pos(self, scene_item, key, x, y):
+        target = ("pos", key)
+        self.buffer.handles[target] = scene_item
+        self.buffer.stage(target, "x", x)
+        self.buffer.stage(target, "y", y)
+
+    def flush(self):
+        """commit staged changes, at most one obs_source_update per source"""
+        recorded = [] if self.recording is not None else None
+        for (kind, name), changed in self.buffer.changes():
+            if recorded is not None:
+                if kind == "pos":  # both coordinates, replay sets them together
+                    changed = self.buffer.committed[(kind, name)]
+                recorded.append([kind, name, dict(changed)])
+            if kind == "source":
+                source = self.cache.get(name)
+                if source is None:
+                    continue
+                settings = self.cache.settings(name)
+                obs_ops["update"] += 1
+                obs.obs_data_clear(settings)
+                data_set(settings, changed)
+                obs.obs_source_update(source, settings)
+            elif kind == "filter":
+                if name in self.filters:
+                    self.filters[name].update(changed)
+            elif kind == "pos":
+                committed = self.buffer.committed[(kind, name)]
+                pos = obs.vec2()
+                pos.x, pos.y = committed["x"], committed["y"]
+                obs_ops["update"] += 1
+                obs.obs_sceneitem_set_pos(self.buffer.handles[(kind, name)], pos)
+        if recorded:
+            self.recording.add(self.tick_index, recorded)
+
+    def attach_filters(self, filters):
+        source = self.cache.get(self.source_name)
+        for filter_id, name, defaults in filters:
+            handle = self.filters[name] = FilterHandle(filter_id, name, defaults)
+            handle.attach(source)
+
+    def detach_filters(self):
+        for name, handle in self.filters.items():
+            handle.detach()
+            self.buffer.forget(("filter", name))
+        self.filters.clear()
 
     @property
     def _obs_source_type(self):
-        with source_ar(self.source_name) as source:
-            return obs.obs_source_get_unversioned_id(source)
+        return self.cache.source_type(self.source_name)
+
+    @property
+    def empty_text(self):
+        return "" if self._obs_source_type == "text_gdiplus" else " "
 
     def clear_text_content(self):
-        if self._obs_source_type == "text_ft2_source":
-            self.update_text(" ")
-        if self._obs_source_type == "text_gdiplus":
-            self.update_text("")
-        if self._obs_source_type is None:
-            self.update_text(" ")
+        self.update_text(self.empty_text)
+
+
+TRIGGER_POLICIES = ("extend", "restart", "queue", "ignore")
+
+SLOT_SETTINGS = (  # settings key, SlotConfig field, obs_data_get_* type
+    ("source", "source_name", "string"),
+    ("use_file", "use_file", "bool"),
+    ("reload_file", "reload_file", "bool"),
+    ("scripted_text", "scripted_text", "string"),
+    ("file_path", "file_path", "string"),
+    ("text_effect", "effect", "string"),
+    ("easing", "easing", "string"),
+    ("tremor_all_scenes", "tremor_all_scenes", "bool"),
+    ("refresh_rate", "refresh_rate", "int"),
+    ("refresh_frames", "refresh_frames", "int"),
+    ("duration", "effect_duration", "int"),
+    ("trigger_policy", "trigger_policy", "string"),
+    ("debounce", "debounce", "int"),
+    ("scramble_iterations", "scramble_iterations", "int"),
+    ("scramble_chars", "scramble_chars", "string"),
+    ("gradient_steps", "gradient_steps", "int"),
+    ("window_size", "window_size", "int"),
+    ("window_unit", "window_unit", "string"),
+    ("playsound", "sound_source_name", "string"),
+    ("layer", "layer_source_name", "string"),
+    ("seed", "seed", "int"),
+    ("record", "record", "bool"),
+    ("record_folder", "record_folder", "string"),
+    ("replay_file", "replay_file", "string"),
+    ("profile", "profiling", "bool"),
+    ("profile_folder", "profile_folder", "string"),
+    ("queue_mode", "queue_mode", "bool"),
+    ("queue_source", "queue_source", "string"),
+    ("queue_size", "queue_size", "int"),
+    ("queue_policy", "queue_policy", "string"),
+)
+
+
+class SlotConfig:
+    """settings of one slot, read and validated once, read only afterwards"""
+
+    # fields applied through Driver methods instead of copied to it
+    managed = (
+        "replay_file",
+        "queue_mode",
+        "queue_source",
+        "queue_size",
+        "queue_policy",
+    )
+    choices = {
+        "easing": tuple(EASINGS),
+        "window_unit": ("lines", "chars"),
+        "trigger_policy": TRIGGER_POLICIES,
+        "queue_policy": QUEUE_POLICIES,
+    }
+
+    def __init__(self, values):
+        object.__setattr__(self, "values", MappingProxyType(values))
+
+    def __getattr__(self, name):
+        try:
+            return self.values[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        raise AttributeError("SlotConfig is read only")
+
+    def __eq__(self, other):
+        return isinstance(other, SlotConfig) and self.values == other.values
+
+    @classmethod
+    def read(cls, settings, index):
+        values = {
+            name: getattr(obs, "obs_data_get_" + kind)(settings, slot_key(key, index))
+            for key, name, kind in SLOT_SETTINGS
+        }
+        return cls(cls.validate(values))
+
+    @classmethod
+    def validate(cls, values):
+        """clamped to property ranges, unknown choices fall back to first one"""
+        for name, choices in cls.choices.items():
+            if values[name] not in choices:
+                values[name] = choices[0]
+        values["effect"] = values["effect"] or "static"
+        values["refresh_rate"] = max(1, values["refresh_rate"])
+        values["refresh_frames"] = max(0, values["refresh_frames"])
+        values["effect_duration"] = 1000 * max(1, values["effect_duration"])
+        values["debounce"] = max(0, values["debounce"])
+        values["scramble_iterations"] = max(1, values["scramble_iterations"])
+        values["scramble_chars"] = values["scramble_chars"] or SCRAMBLE_CHARS
+        values["gradient_steps"] = max(1, values["gradient_steps"])
+        values["window_size"] = max(0, values["window_size"])
+        values["queue_size"] = max(1, values["queue_size"])
+        return values
+
+    def changed(self, other, *names):
+        """any of names differs from other config, None differs in every field"""
+        return other is None or any(self.values[i] != other.values[i] for i in names)
 
 
 class Driver(TextContent):
-    def __init__(self):
+    scheduler = scheduler
+    windowed_effects = ("typewriter", "scrmbl", "scroll")
+    queue_poll = 250  # ms between checks of an idle queue
+
+    def __init__(self, index=0):
         super().__init__()
+        self.index = index
         self.scripted_text = "default value"
         self.sound_source_name = None
         self.layer_source_name = None
         self.effect = "static"
+        self.chain = parse_chain(self.effect)
+        self.input_text = ""  # output of previous stage of the chain
         self.use_file = False
         self.reload_file = False
         self.path = str(Path.home())
         self.file_path = ""
-        self.txt_efcts = self.load()
-
-        self.first_run = True  # text effect
+        self.watched_file = WatchedFile()
+        self.stages = []  # (name, Effect or None) of the chain
+        self.queue = self.queue_reader = None
+        self.queue_settings = ("", 0, "")
+        self.message = None  # queued message of current run
+        self.frame_builders = {
+            "typewriter": self.typewriter_frames,
+            "erase": self.erase_frames,
+            "loading": self.loading_frames,
+            "fastread": self.fastread_frames,
+            "blink": self.blink_frames,
+        }
+        self.frame_tables = {}
+        self.tween_builders = {
+            "fade": self.fade_tweens,
+            "hue": self.hue_tweens,
+            "tremor": self.tremor_tweens,
+        }
+        self.tweens = {}
+        self.easing = "ease_in_out"
+        self.tremor_all_scenes = False
+        self.template = None
+        self.scramble = None
+        self.scramble_tick = -1
+        self.scramble_iterations = 3
+        self.scramble_chars = SCRAMBLE_CHARS
+        self.window_size = 0  # lines or chars shown around cursor, 0 = all
+        self.window_unit = "lines"
+        self.window = None  # TextWindow of current text
+
+        self.colors = None  # rainbow colors of current run, native encoding
+        self.gradient_steps = 1
         self.lock = True  # ticker
         self.start = True  # media source & layer source
         self.refresh_rate = 250
-        self.duration = 5
-        self.effect_duration = 3
-
-    def load(self):
-        mapping = dict()
-        effects_list = []
-        for i in dir(self):
-            if "effect" in i:
-                try:
-                    if i.split("_")[1] == "effect":
-                        effects_list.append(i.split("_")[0])
-                except IndexError:
-                    continue
-        for i in effects_list:
-            mapping[i] = getattr(self, i + "_" + "effect")
-        return mapping
+        self.refresh_frames = 0  # > 0: ticked every n video frames, not by timer
+        self.next_frame = 0  # scheduler.frame of next tick in frames mode
+        self.start_frame = 0  # scheduler.frame the run started on
+        self.now = self.started = self.deadline = self.clock()
+        self.effect_duration = 5 * 1000
+        self.run_duration = self.effect_duration
+        self.tick_index = -1  # frame of current run, derived from clock
+        self.lateness = self.max_lateness = 0
+        self.skipped_frames = 0
+        self.profiling = False
+        self.profile_folder = ""  # export folder, "" = no export
+        self.profile = None  # TickProfile of last run
+        self.seed = 0  # 0 = new random seed every run
+        self.rng = Random()
+        self.record = False
+        self.record_folder = ""  # export folder, "" = keep in memory only
+        self.replay_file = ""
+        self.replay_recording = None  # Recording played by replay effect
+        self.replay_position = None  # next tick of replay_recording
+        self.wake_at = 0  # clock() of next tick while sleeping in scheduler
+        self.holds = 0  # stages of this tick whose output stays the same
+        self.triggers = deque()  # (kind, clock()) of presses, applied by ticker
+        self.trigger_policy = "extend"  # press while a run is shown
+        self.debounce = 100  # ms, presses closer to the last one are coalesced
+        self.last_trigger = -inf
+        self.queued_run = False  # run starting when current one ends
+        self.config = None  # SlotConfig in use
+        self.pending_config = None  # latest SlotConfig, applied by ticker
+
+    clock = staticmethod(clock)
 
-    def read_file(self, path):
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                content = f.read()
-                return content
-        except Exception as e:
-            print("error reading file", e)
-            return "error"
+    @property
+    def elapsed(self):
+        """ms since trigger"""
+        return self.now - self.started
+
+    @property
+    def duration(self):
+        """ms left of current run"""
+        return max(0, self.deadline - self.now)
+
+    @duration.setter
+    def duration(self, value):
+        self.now = self.clock()
+        self.deadline = self.now + value
 
     @property
     def _scripted_text(self):
-        if self.use_file and self.reload_file:
-            return self.read_file(self.file_path)
+        if self.message is not None:
+            return self.message.text
+        if self.use_file:
+            return self.watched_file.text
         return self.scripted_text
 
+    def watch_file(self, path, follow=True):
+        """file is loaded in file_worker, ticks read its last snapshot"""
+        watched = self.watched_file
+        if path == watched.path and follow == watched.follow:
+            return
+        file_worker.unwatch(watched)
+        self.watched_file = WatchedFile(path, follow)
+        if path:
+            file_worker.watch(self.watched_file)
+
+    def set_queue(self, spec, maxsize=16, policy="drop_oldest"):
+        """queue mode: messages from spec are shown back to back, "" turns it off"""
+        if (spec, maxsize, policy) == self.queue_settings:
+            return
+        self.queue_settings = (spec, maxsize, policy)
+        if self.queue_reader is not None:
+            self.queue_reader.stop()
+        self.queue = self.queue_reader = None
+        if not spec:
+            if self.lock:
+                self.scheduler.remove(self)
+            return
+        self.queue = MessageQueue(maxsize, policy)
+        self.queue.on_push = self.message_pushed
+        self.queue_reader = QueueReader(spec, self.queue)
+        self.queue_reader.start()
+        self.scheduler.add(self)  # idle ticks pull next message
+
+    def message_pushed(self):
+        """reader thread, which must not call obs: marks the slot due,
+        the poll timer kept armed while the queue is idle ticks it"""
+        self.wake_at = 0
+
+    def next_message(self):
+        """start next queued message, if any"""
+        message = self.queue.pop()
+        if message is None:
+            return
+        self.message = message
+        self.start_run(
+            message.effect or self.effect, message.duration or self.effect_duration
+        )
+
+    def configure(self, config):
+        """config is applied as a whole by ticker, between two ticks"""
+        if config == self.pending_config:
+            return
+        self.pending_config = config
+        self.scheduler.add(self)
+        self.scheduler.wake(self)
+
+    def apply_config(self, config):
+        """copy config, side effects only for fields which changed"""
+        old, self.config = self.config, config
+        for name, value in config.values.items():
+            if name not in config.managed:
+                setattr(self, name, value)
+        if config.refresh_frames:
+            self.refresh_rate = config.refresh_frames * frame_interval()
+        if config.changed(old, "use_file", "reload_file", "file_path"):
+            path = config.file_path if config.use_file else ""
+            self.watch_file(path, config.reload_file)
+        if config.changed(old, "replay_file"):
+            self.load_replay(config.replay_file)
+        if config.changed(
+            old, "queue_mode", "queue_source", "queue_size", "queue_policy"
+        ):
+            self.set_queue(
+                config.queue_source if config.queue_mode else "",
+                config.queue_size,
+                config.queue_policy,
+            )
+        if old is None:
+            return
+        for name in ("source_name", "sound_source_name", "layer_source_name"):
+            if config.changed(old, name):
+                self.cache.invalidate(getattr(config, name))
+        if config.changed(old, "sound_source_name"):
+            source = self.cache.get(old.sound_source_name)
+            if source is not None:
+                obs.obs_source_media_stop(source)
+        if config.changed(old, "layer_source_name") and not self.start:
+            source = self.cache.get(old.layer_source_name)  # shown by this run
+            if source is not None:
+                obs.obs_source_set_enabled(source, False)
+            self.enable_layer()
+
     def play_sound(self):
-        with source_ar(self.sound_source_name) as source:
+        source = self.cache.get(self.sound_source_name)
+        if source is not None:
             obs.obs_source_media_restart(source)
 
-    def stop_sound(self):
-        with source_ar(self.sound_source_name) as source:
-            obs.obs_source_media_stop(source)
-
     def enable_layer(self):
-        with source_ar(self.layer_source_name) as source:
+        source = self.cache.get(self.layer_source_name)
+        if source is not None:
             obs.obs_source_set_enabled(source, True)
 
     def disable_layer(self):
-        with source_ar(self.layer_source_name) as source:
+        source = self.cache.get(self.layer_source_name)
+        if source is not None:
             obs.obs_source_set_enabled(source, False)
 
     def synchronized_start(self):
@@ -193,325 +1816,561 @@ class Driver(TextContent):
             self.enable_layer()
             self.start = False
 
-    def ticker(self, text_effect):
+    def stop(self):
+        """end current run, detach its filters and reset to initial state"""
+        self.clear_text_content()
+        self.disable_layer()
+        self.detach_filters()
+        self.flush()
+        if self.queue is None and not self.queued_run:
+            self.scheduler.remove(self)
+        self.message = None
+        self.lock = self.start = True
+        self.reset_state()
+
+    def reset_state(self):
+        """per run state back to initial, before a run starts and after it ends"""
+        self.tick_index = -1
+        self.wake_at = 0
+        self.holds = 0
+        self.lateness = self.max_lateness = self.skipped_frames = 0
+        self.buffer.forget()
+        self.colors = None
+        self.frame_tables = {}
+        self.tweens = {}
+        self.template = None
+        self.scramble = None
+        self.scramble_tick = -1
+        self.last_jump_x = self.last_jump_y = 0
+        self.replay_position = None
+        self.stages = []
+
+    def ticker(self):
         """ main time primitive """
         # effects updated every self.refresh_rate ms
         def check_duration():
-            if self.duration <= 0:
-                self.clear_text_content()
-                self.disable_layer()
-                obs.remove_current_callback()
-                self.duration = 5 * 1000
-                self.lock = self.first_run = self.start = True
-                self.last_jump_y, self.last_jump_x = 0, 0
-                self.lst_index = self.rand_index = self.wpm_index = self.lst_rev = 0
-
+            if self.duration <= self.refresh_rate / 2:
+                self.stop()
+
+        config = self.pending_config  # swapped by script_update
+        if config is not None and config is not self.config:
+            self.apply_config(config)
+        if self.triggers:
+            self.apply_triggers()
+
+        if self.lock:  # between runs
+            if self.queued_run:
+                self.queued_run = False
+                self.start_run(self.effect, self.effect_duration)
+            elif self.queue is not None:
+                self.next_message()
+                if self.lock:
+                    # polled, a push only marks the slot due
+                    self.scheduler.sleep(self, self.clock() + self.queue_poll)
+            else:
+                self.scheduler.remove(self)
+            return
+
+        self.now = self.clock()
+        if self.duration > self.refresh_rate and not self.visible():
+            # nothing to show, time still runs, see on_source_show,
+            # last tick ends the run even when hidden
+            self.scheduler.sleep(self, self.deadline - self.refresh_rate)
+            return
+
+        # frame due now, late callbacks skip intermediate frames
+        if self.refresh_frames:  # counted in video frames, immune to jitter
+            elapsed = self.scheduler.frame - self.start_frame
+            frame = max(0, elapsed // self.refresh_frames - 1)
+        else:
+            frame = max(0, round((self.now - self.started) / self.refresh_rate) - 1)
+        if frame <= self.tick_index and self.duration > 0:
+            return
+        skipped = max(0, frame - self.tick_index - 1)
+        self.skipped_frames += skipped
+        self.lateness = self.now - self.started - (frame + 1) * self.refresh_rate
+        self.max_lateness = max(self.max_lateness, abs(self.lateness))
+        self.tick_index = frame
+
+        profile = self.profile if self.profiling else None
+        if profile is not None:
+            ops_before = profile.ops_snapshot()
+            tick_started = perf_counter()
         try:
             self.synchronized_start()
-            self.txt_efcts[text_effect]()
-            self.duration -= self.refresh_rate
+            # each stage transforms the text of the previous one,
+            # combined output is committed once in flush
+            self.text_string = self.chain_text()
+            self.holds = 0
+            for name, stage in self.stages:
+                if stage is None:
+                    self.duration = 0
+                    check_duration()
+                    raise Exception(f"No such effect: {name}")
+                self.input_text = self.text_string
+                if profile is None:
+                    stage.tick()
+                else:
+                    stage_started = perf_counter()
+                    stage.tick()
+                    profile.add(name, perf_counter() - stage_started)
             check_duration()
+            if not self.lock and self.holds == len(self.stages) and not self.reloading:
+                # same frame until the end, next tick only to stop
+                self.scheduler.sleep(self, self.deadline - self.refresh_rate / 2)
+
+        finally:
+            self.flush()
+            if profile is not None:
+                profile.add_tick(
+                    frame,
+                    perf_counter() - tick_started,
+                    self.lateness,
+                    skipped,
+                    ops_before,
+                )
+                if self.lock and self.profile_folder:  # run ended
+                    self.export_profile()
+            if self.lock and self.recording is not None:  # run ended
+                self.recording.header["end"] = frame
+                if self.record_folder:
+                    self.export_recording()
+
+    def export_recording(self):
+        """written in a thread, disk stays off the tick"""
+        stem = f"scripted_text_{self.index + 1}_{strftime('%Y%m%d_%H%M%S')}"
+        path = Path(self.record_folder) / f"{stem}.json.gz"
+        threading.Thread(target=self.recording.save, args=(path,), daemon=True).start()
+
+    def load_replay(self, path):
+        """recording for replay effect, loaded in a thread"""
+        self.replay_file = path
+        self.replay_recording = None
+
+        def load():
+            try:
+                recording = Recording.load(path)
+            except Exception as e:
+                print("error loading recording", e)
+                return
+            if self.replay_file == path:
+                self.replay_recording = recording
+
+        if path:
+            threading.Thread(target=load, daemon=True).start()
+
+    def export_profile(self):
+        """written in a thread, disk stays off the tick"""
+        stem = f"scripted_text_{self.index + 1}_{strftime('%Y%m%d_%H%M%S')}"
+        threading.Thread(
+            target=self.profile.export, args=(self.profile_folder, stem), daemon=True
+        ).start()
+
+    def hold(self):
+        """stage's output won't change until the run ends"""
+        self.holds += 1
+
+    def visible(self):
+        """text source is shown in program or preview"""
+        source = self.cache.get(self.source_name)
+        return source is None or obs.obs_source_showing(source)
 
-        except KeyError:
-            self.duration = 0
-            check_duration()
-            raise Exception(f"No such effect: {text_effect}")
+    @property
+    def reloading(self):
+        return self.use_file and self.reload_file
+
+    def chain_text(self):
+        """scripted text without rainbow palette, which is not shown"""
+        text = self._scripted_text
+        if "rainbow" in self.chain:
+            return text.partition(";")[0]  # stops at first ";"
+        return text
 
+    @builtin_effect()
     def static_effect(self):
         "just show text "
-        self.update_text(self._scripted_text)
+        self.update_text(self.input_text)
+        self.hold()
 
+    @builtin_effect(params=("gradient_steps",))
     def rainbow_effect(self):
         """cycle threw default palette or provide yours.Syntax:
             scripted text;0xff00ff,0x00ff,etc"""
+        if self.colors is None:
+            self.colors = self.rainbow_colors()
+        color = self.colors[self.tick_index % len(self.colors)]
+        self.update_text(self.input_text, color=color)
+
+    def rainbow_colors(self):
+        """palette parsed, blended and converted once per run"""
+        colors = []
         if ";" in self._scripted_text:
-            if self.first_run:
-                res = self._scripted_text.split(";")[1].split(",")
-                self._text = self._scripted_text.split(";")[0]
-                colors = []
-                for i in res:
-                    try:
-                        color = literal_eval(i)
-                        colors.append(color)
-                    except Exception as e:
-                        print(e)
-                        continue
-
-                if len(colors) > 0:
-                    self.user_palette = cycle(colors)
+            for i in self._scripted_text.split(";")[1].split(","):
+                try:
+                    color = literal_eval(i.strip())
+                except Exception:
+                    color = None
+                if type(color) is int and 0 <= color <= 0xFFFFFF:
+                    colors.append(color)
                 else:
-                    self.user_palette = self.palette
-
-                self.first_run = False
-                self.update_text(self._text, color=next(self.user_palette))
-            else:
-                self.update_text(self._text, color=next(self.user_palette))
-
-        else:
-            self.update_text(self._scripted_text, color=next(self.palette))
-
+                    print("rainbow: skipped color", repr(i), "not in 0x000000-0xffffff")
+        source_type = self._obs_source_type
+        return [
+            native_color(i, source_type)
+            for i in gradient(colors or self.default_palette, self.gradient_steps)
+        ]
+
+    def compile_frames(self):
+        """build frame tables of deterministic effects in the chain"""
+        text = self.chain_text()
+        self.frame_tables = {
+            name: self.frame_builders[name](text)
+            for name in self.chain
+            if name in self.frame_builders
+            and not (self.window_size and name in self.windowed_effects)
+        }
+
+    def text_window(self, text):
+        """TextWindow of text, rebuilt only when text or window settings change"""
+        window = self.window
+        if (
+            window is None
+            or window.text != text
+            or window.size != self.window_size
+            or window.unit != self.window_unit
+        ):
+            window = self.window = TextWindow(text, self.window_size, self.window_unit)
+        return window
+
+    def push_frame(self, name):
+        """show next frame, rebuilding the table only when input text changed"""
+        text = self.input_text
+        table = self.frame_tables.get(name)
+        if table is None or table.source_text != text:
+            table = self.frame_tables[name] = self.frame_builders[name](text)
+        self.update_text(table[self.tick_index])
+        if not table.loop and self.tick_index >= len(table) - 1:
+            self.hold()  # last frame is held
+
+    @builtin_effect()
     def blink_effect(self):
         "on and off"
-        flag = next(self.blinking)
-        if flag:
-            self.update_text(self._scripted_text)
-        else:
-            self.clear_text_content()
+        self.push_frame("blink")
 
+    def blink_frames(self, text):
+        return FrameTable(text, [text, self.empty_text], loop=True)
+
+    @builtin_effect()
     def loading_effect(self):
         "dots..."
-        self.update_text(self._scripted_text + next(self.dots))
+        self.push_frame("loading")
 
-    def tremor_effect(self):
-        "random movements in range(-100,100)[current scene only]"
-        flag = next(self.position_swap)
-        if flag:
-            self.update_text(self._scripted_text)
-            current_scene = obs.obs_frontend_get_current_scene()
-            with source_ar(self.source_name) as source, scene_ar(
-                current_scene
-            ) as scene:
-                scene_item = obs.obs_scene_find_source(scene, self.source_name)
-                pos = obs.vec2()
-                self.location = pos
-                obs.obs_sceneitem_get_pos(
-                    scene_item, self.location
-                )  # update to last position if its changed from OBS
-
-                if not self.last_jump_x == 0:
-                    if self.last_jump_x < 0:
-                        # minus minus
-                        self.location.x -= self.last_jump_x
-                    if self.last_jump_x > 0:
-                        self.location.x -= self.last_jump_x
-
-                if not self.last_jump_y == 0:
-                    if self.last_jump_y < 0:
-                        self.location.y -= self.last_jump_y
-                    if self.last_jump_y > 0:
-                        self.location.y -= self.last_jump_y
-
-                if scene_item:
-                    obs.obs_sceneitem_set_pos(scene_item, self.location)
+    def loading_frames(self, text):
+        return FrameTable(text, [text + i for i in self.dots], loop=True)
 
+    @builtin_effect(cost="medium", params=("easing", "tremor_all_scenes"))
+    def tremor_effect(self):
+        "random movements in range(-100,100)[current or all scenes]"
+        self.update_text(self.input_text)
+        items = self.scenes.items_of(self.source_name, self.tremor_all_scenes)
+        if not items:
+            return
+        jump_x, jump_y = self.last_jump_x, self.last_jump_y
+        # finish early , and set to default
+        if self.duration // self.refresh_rate <= 3:
+            self.duration = 0
+            self.last_jump_x = self.last_jump_y = 0
         else:
-            self.update_text(self._scripted_text)
-            current_scene = obs.obs_frontend_get_current_scene()
-            with source_ar(self.source_name) as source, scene_ar(
-                current_scene
-            ) as scene:
-                scene_item = obs.obs_scene_find_source(scene, self.source_name)
-                pos = obs.vec2()
-                self.location = pos
-                obs.obs_sceneitem_get_pos(
-                    scene_item, self.location
-                )  # update to last position if its changed from OBS
-
-                if scene_item:
-                    # finish early , and set to default
-                    if self.duration // self.refresh_rate <= 3:
-                        self.duration = 0
-                        obs.obs_sceneitem_set_pos(scene_item, self.location)
-
-                    else:
-                        next_pos = obs.vec2()
-                        withoutzero = list(range(-101, 0)) + list(range(1, 101))
-                        self.last_jump_x = choice(withoutzero)
-                        self.last_jump_y = choice(withoutzero)
-                        dx, dy = self.last_jump_x, self.last_jump_y
-                        next_pos.x, next_pos.y = (
-                            self.location.x + dx,
-                            self.location.y + dy,
-                        )
-                        obs.obs_sceneitem_set_pos(scene_item, next_pos)
+            self.last_jump_x, self.last_jump_y = self.tweens["offset"](self.elapsed)
+
+        pos = obs.vec2()
+        for scene_name, scene_item in items:
+            obs.obs_sceneitem_get_pos(
+                scene_item, pos
+            )  # update to last position if its changed from OBS
+            self.set_pos(
+                scene_item,
+                (scene_name, self.source_name),
+                pos.x - jump_x + self.last_jump_x,
+                pos.y - jump_y + self.last_jump_y,
+            )
 
+    def tremor_tweens(self):
+        period = round(2 * self.refresh_rate)
+        jumps = tremor_jumps(self.rng)
+        keyframes = [(0, (0, 0))]
+        for t in range(period, self.run_duration, period):
+            keyframes.append((t, (next(jumps), next(jumps))))
+        keyframes.append((self.run_duration, (0, 0)))
+        return {"offset": Tween(keyframes, self.easing)}
+
+    @builtin_effect(filters=[("scroll_filter", "py_scroll", {"speed_x": 5000})])
     def sanic_effect(self):
         "really fast speed text scrolling(filter)"
-        # add filter scroll to source if not present,
-        self.update_text(self._scripted_text)
-        with source_ar(self.source_name) as source, filter_ar(
-            source, "py_scroll"
-        ) as scroll:
-            if scroll is None:
-                with data_ar() as settings:
-                    obs.obs_data_set_int(settings, "speed_x", 5000)
-                    with p_source_ar("scroll_filter", "py_scroll", settings) as _source:
-                        obs.obs_source_filter_add(source, _source)
-
-            with data_ar(scroll) as filter_settings:
-                obs.obs_data_set_int(filter_settings, "speed_x", 5000)
-                obs.obs_source_update(scroll, filter_settings)
-                if self.duration // self.refresh_rate <= 3:
-                    obs.obs_source_filter_remove(source, scroll)
-                    self.duration = 0
+        self.update_text(self.input_text)
+        self.set_filter("py_scroll", "speed_x", 5000)
+        if self.duration // self.refresh_rate <= 3:
+            self.duration = 0
 
+    @builtin_effect()
     def typewriter_effect(self):
         """simulate typing"""
-        l = len(self._scripted_text)
-        result = self._scripted_text[: self.lst_index]
-        space_count = l - len(result)
-        result += space_count * " "
-        self.lst_index += 1
-        self.update_text(result)
-
+        if not self.window_size:
+            self.push_frame("typewriter")
+            return
+        text = self.input_text
+        cursor = min(self.tick_index, len(text))
+        start, end = self.text_window(text).view(cursor)
+        self.update_text(text[start:cursor].ljust(end - start))
+
+    def typewriter_frames(self, text):
+        l = len(text)
+        cuts = [(0, i, l) for i in range(l + 1)]
+        return FrameTable(text, SliceFrames(text, cuts))
+
+    @builtin_effect(params=("scramble_iterations", "scramble_chars"))
     def scrmbl_effect(self):
         """random chars revealing"""
-        try:
-            self._text_chars = list(self.text_chars(self._scripted_text))
-            self.update_text(self._text_chars[self.rand_index])
-            self.rand_index += 1
-        except IndexError:
-            self.update_text(self._scripted_text)
-
-    def text_chars(self, scripted_str):
-        """inspired by https://github.com/etienne-napoleone/scrmbl """
-
-        ALL_CHARS = string.digits + string.ascii_letters + string.punctuation
-
-        def gen(scripted_str, iterations):
-            seed()  # set new seed
-            echoed = ""
-            fill = len(scripted_str)
-            for char in scripted_str:
-                for _ in range(iterations):
-                    if char != " ":
-                        ran_char = choice(ALL_CHARS)
-                        yield f"{echoed}{ran_char}{' '*fill}"
-                    else:
-                        yield f"{echoed}{' '*fill}"
-                echoed += char
-            if echoed:  # last char
-                yield f"{echoed}"
-
-        return gen(scripted_str, 3)
+        text = self.input_text
+        if self.scramble is None or self.scramble.text != text:
+            self.scramble = ScrambleStream(
+                text,
+                self.scramble_iterations,
+                self.scramble_chars,
+                self.rng.randrange(2 ** 31),
+                self.text_window(text) if self.window_size else None,
+            )
+            self.scramble_tick = self.tick_index - 1
+        self.scramble.advance(self.tick_index - self.scramble_tick - 1)
+        self.scramble_tick = self.tick_index
+        self.update_text(next(self.scramble))
+
+    @builtin_effect(params=("window_size", "window_unit"))
+    def scroll_effect(self):
+        """scroll through text, window lines(or chars) at time, one per tick"""
+        text = self.input_text
+        if not self.window_size:
+            self.update_text(text)
+            return
+        self.update_text(self.text_window(text).page(self.tick_index))
+
+    @builtin_effect(params=("replay_file",))
+    def replay_effect(self):
+        """play a recorded run back(Record runs), without running its effects"""
+        recording = self.replay_recording
+        if recording is None:
+            self.duration = 0
+            return
+        header = recording.header
+        if self.replay_position is None:  # first tick
+            self.replay_position = 0
+            self.duration = header["duration"] - self.elapsed
+            self.attach_filters(recording.filters)
+        # recorded tick due now, whatever refresh rate replays it
+        due = round(self.elapsed / header["refresh_rate"]) - 1
+        ticks = recording.ticks
+        position = self.replay_position
+        while position < len(ticks) and ticks[position][0] <= due:
+            for kind, name, values in ticks[position][1]:
+                self.replay_change(kind, name, values)
+            position += 1
+        self.replay_position = position
+        end = header.get("end")  # last tick of recorded run
+        finished = position >= len(ticks) if end is None else due >= end
+        if finished:
+            self.duration = 0
 
+    def replay_change(self, kind, name, values):
+        """recorded change, applied to this slot's text source"""
+        if kind == "source":
+            for key, value in values.items():
+                self.buffer.stage(("source", self.source_name), key, value)
+        elif kind == "filter":
+            for key, value in values.items():
+                self.set_filter(name, key, value)
+        elif kind == "pos":
+            scene_name = name[0]
+            item = self.scenes.find(scene_name, self.source_name)
+            if item is not None:
+                key = (scene_name, self.source_name)
+                self.set_pos(item, key, values["x"], values["y"])
+
+    @builtin_effect()
     def fastread_effect(self):
         """show one word at time separate with ";"
         """
-        try:
-            self._wpm_chars = self.wpm_chars()
-            self.update_text(self._wpm_chars[self.wpm_index])
-            self.wpm_index += 1
-        except IndexError:
-            self.clear_text_content()
-
-    def wpm_chars(self):
-        s = self._scripted_text.split(";")
+        self.push_frame("fastread")
+
+    def fastread_frames(self, text):
+        return FrameTable(text, self.wpm_chars(text) + [self.empty_text])
+
+    def wpm_chars(self, text):
+        s = text.split(";")
         m = len(max(s, key=len))
         return [i.center(m, " ") for i in s]
 
+    @builtin_effect(cost="medium")
     def timer_effect(self):
         """ timer syntax "seconds = $s , centisecond = $cs"
+        also $ms $h $m $mm $ss $remaining $elapsed $pc $bar
         """
-        m_s = self.duration
-        d = timedelta(milliseconds=m_s)
-        s = d.seconds
-        cs = str(d.microseconds)[:2]
-        n = self._scripted_text
-        ts = Template(n)
-        try:
-            time_data = ts.substitute(s=s, cs=cs)
-            self.update_text(time_data)
-        except:  # skip errors when  incorrect substitition happens
-            self.update_text(self._scripted_text)
-
+        self.update_text(self.render_template())
+
+    def render_template(self):
+        """scripted text with placeholders, compiled when text changes"""
+        text = self.input_text
+        if self.template is None or self.template.text != text:
+            self.template = CompiledTemplate(text)
+        if self.template.error and not self.template.reported:
+            print("template error:", self.template.error)
+            self.template.reported = True
+        return self.template.render(self.duration, self.elapsed, self.run_duration)
+
+    @builtin_effect(params=("easing",), filters=[("color_filter", "py_hue", {})])
     def hue_effect(self):
         "apply random hue,add second color to see the effect"
-        self.update_text(self._scripted_text)
-        with source_ar(self.source_name) as source, filter_ar(source, "py_hue") as hue:
-            if hue is None:
-                with data_ar() as settings:
-                    with p_source_ar("color_filter", "py_hue", settings) as _source:
-                        obs.obs_source_filter_add(source, _source)
-
-            with data_ar(hue) as filter_settings:
-                seed()
-                n = randrange(-180, 180)
-                obs.obs_data_set_int(filter_settings, "hue_shift", n)
-                obs.obs_source_update(hue, filter_settings)
-                if self.duration // self.refresh_rate <= 3:
-                    obs.obs_source_filter_remove(source, hue)
-                    self.duration = 0
+        self.update_text(self.input_text)
+        self.set_filter("py_hue", "hue_shift", round(self.tweens["hue"](self.elapsed)))
+        if self.duration // self.refresh_rate <= 3:
+            self.duration = 0
+
+    def hue_tweens(self):
+        period = max(round(4 * self.refresh_rate), 500)
+        keyframes = [
+            (t, self.rng.randrange(-180, 180))
+            for t in range(0, self.run_duration, period)
+        ]
+        return {"hue": Tween(keyframes, self.easing)}
 
+    @builtin_effect(params=("easing",), filters=[("color_filter", "py_fade", {})])
     def fade_effect(self):
         "fade text via opacity filter"
-        self.update_text(self._scripted_text)
-        with source_ar(self.source_name) as source, filter_ar(
-            source, "py_fade"
-        ) as fade:
+        self.update_text(self.input_text)
+        self.set_filter("py_fade", "opacity", round(self.tweens["opacity"](self.elapsed)))
+        if self.duration // self.refresh_rate <= 3:
+            self.duration = 0
 
-            if fade is None:
-                with data_ar() as settings:
-                    with p_source_ar("color_filter", "py_fade", settings) as _source:
-                        obs.obs_source_filter_add(source, _source)
-
-            with data_ar(fade) as filter_settings:
-                try:
-                    coefficient = self.effect_duration / self.duration
-                    percent = 100 / coefficient
-                except ZeroDivisionError:
-                    percent = 0
-                obs.obs_data_set_int(filter_settings, "opacity", int(percent))
-                obs.obs_source_update(fade, filter_settings)
-                if self.duration // self.refresh_rate <= 3:
-                    obs.obs_source_filter_remove(source, fade)
-                    self.duration = 0
+    def fade_tweens(self):
+        keyframes = [(0, 100), (self.run_duration, 0)]
+        return {"opacity": Tween(keyframes, self.easing)}
 
+    @builtin_effect(cost="medium")
     def percent_effect(self):
         """ percent syntax "sample text $pc"
+        also $bar and timer placeholders
         """
-        try:
-            coefficient = self.effect_duration / self.duration
-            percent = 100 / coefficient
-        except ZeroDivisionError:
-            percent = 0
-        n = self._scripted_text
-        ts = Template(n)
-        try:
-            percent_time = ts.substitute(pc=f"{percent:.2f}%")
-            self.update_text(percent_time)
-        except:  # skip errors when  incorrect substitition happens
-            self.update_text(self._scripted_text)
+        self.update_text(self.render_template())
 
+    @builtin_effect()
     def erase_effect(self):
         "similiar to typewriter, but erase and start with new string, separate with ;"
-
-        if self.first_run:
-            self.splitted_text = cycle(self._scripted_text.split(";"))
-            self.next_string = next(self.splitted_text)
-            self.first_run = False
-
-        l = len(self.next_string)
-        result = self.next_string[: self.lst_index]
-        space_count = l - len(result)
-        result += space_count * " "
-        self.lst_index += 1
-        if self.lst_index > l:
-            result = (
-                self.next_string[: -self.lst_rev]
-                if self.lst_rev != 0
-                else self.next_string  # keep last character
-            )
-            self.lst_rev += 1
-            if self.lst_rev > l:
-                self.lst_index = 0
-                self.next_string = next(self.splitted_text)
-            self.update_text(result)
-        else:
-            self.lst_rev = 0
-            self.update_text(result)
+        self.push_frame("erase")
+
+    def erase_frames(self, text):
+        cuts = []
+        start = 0
+        for line in text.split(";"):
+            end = start + len(line)
+            cuts.extend((start, i, end - start) for i in range(start, end))
+            cuts.append((start, end, 0))  # keep last character
+            cuts.extend((start, i, 0) for i in range(end - 1, start - 1, -1))
+            start = end + 1
+        return FrameTable(text, SliceFrames(text, cuts), loop=True)
 
     def hotkey_hook(self):
-        """ trigger hotkey event"""
-        self.duration = self.effect_duration
-        interval = self.refresh_rate
-        if self.lock:
-            self.ticker = partial(self.ticker, text_effect=self.effect)
-            obs.timer_add(self.ticker, interval)
-        self.lock = False
+        """ trigger hotkey event, applied by ticker on next tick"""
+        self.triggers.append(("trigger", self.clock()))
+        self.scheduler.add(self)
+        self.scheduler.wake(self)
+
+    def build_tweens(self):
+        """tweens of the chain's effects, over current run_duration"""
+        self.tweens = {}
+        for name in self.chain:
+            if name in self.tween_builders:
+                self.tweens.update(self.tween_builders[name]())
 
     def reset_duration(self):
-        self.duration = 0
+        """ends shown run on next tick, drops queued one"""
+        self.triggers.append(("reset", self.clock()))
+        self.scheduler.add(self)
+        self.scheduler.wake(self)
+
+    def apply_triggers(self):
+        """presses since last tick, in order, at a tick boundary"""
+        while self.triggers:
+            kind, at = self.triggers.popleft()
+            if kind == "reset":
+                self.queued_run = False
+                if not self.lock:
+                    self.deadline = min(self.deadline, at)
+                continue
+            if at - self.last_trigger < self.debounce:
+                continue  # burst of presses, one trigger
+            self.last_trigger = at
+            if self.lock:
+                if self.refresh_frames:  # first frame on this video frame
+                    at = self.clock() - self.refresh_rate
+                self.start_run(self.effect, self.effect_duration, at)
+                if self.refresh_frames:
+                    self.start_frame -= self.refresh_frames
+            elif self.trigger_policy == "extend":
+                self.deadline = at + self.effect_duration
+                self.run_duration = round(self.deadline - self.started)
+                self.build_tweens()  # keyframes span the longer run
+            elif self.trigger_policy == "restart":
+                # shown run ends on this tick, effects restore what they moved
+                self.deadline = min(self.deadline, at)
+                self.queued_run = True
+            elif self.trigger_policy == "queue":
+                self.queued_run = True  # more presses still queue one run
+
+    def start_run(self, effect, duration, at=None):
+        """set up effect chain for a run of duration ms, started at clock() at"""
+        self.reset_state()
+        self.now = self.clock()
+        self.started = self.now if at is None else at
+        self.start_frame = self.scheduler.frame
+        self.deadline = self.started + duration
+        self.run_duration = round(duration)
+        self.chain = parse_chain(effect)
+        self.profile = TickProfile(effect) if self.profiling else None
+        self.run_seed = self.seed or Random().randrange(1, 2 ** 31)
+        self.rng = Random(self.run_seed)
+        self.recording = None
+        if self.record:
+            source_type = self._obs_source_type
+            self.recording = Recording(
+                {
+                    "effect": effect,
+                    "text": self._scripted_text,  # with rainbow palette
+                    "seed": self.run_seed,
+                    "refresh_rate": self.refresh_rate,
+                    "duration": self.run_duration,
+                    "settings": {i: getattr(self, i) for i in Recording.settings},
+                    "source_type": source_type,
+                    "filters": [
+                        list(f)
+                        for name in self.chain
+                        if effects.get(name) is not None
+                        for f in effects.get(name).filters
+                    ],
+                }
+            )
+        self.compile_frames()
+        for name in self.chain:
+            cls = effects.get(name)
+            stage = cls(self) if cls is not None else None
+            self.stages.append((name, stage))
+            if stage is None:
+                continue
+            if name in TEMPLATE_EFFECTS:
+                self.template = CompiledTemplate(self.chain_text())
+            self.attach_filters(stage.filters)
+            stage.start()
+        self.build_tweens()
+        self.lock = False
+        self.scheduler.add(self)
 
 
 class Hotkey:
@@ -547,23 +2406,37 @@ class Hotkey:
         obs.obs_data_array_release(self.hotkey_saved_key)
 
 
-class h:
-    htk_copy = None  # this attribute will hold instance of Hotkey
-
+MAX_SLOTS = 8
+slots = [Driver()]
+std = slots[0]
+slot_count = 1
+hotkeys = []
 
-std = Driver()
-h1 = h()
-h2 = h()
 
-
-def trigger(pressed):
+def trigger(driver, pressed):
     if pressed:
-        return std.hotkey_hook()
+        return driver.hotkey_hook()
 
 
-def reset(pressed):
+def reset(driver, pressed):
     if pressed:
-        return std.reset_duration()
+        return driver.reset_duration()
+
+
+def ensure_slots(count, settings):
+    """create drivers and register hotkeys for first count slots"""
+    while len(slots) < count:
+        slots.append(Driver(len(slots)))
+    while len(hotkeys) < count:
+        driver = slots[len(hotkeys)]
+        name = "" if driver.index == 0 else f" {driver.index + 1}"
+        trigger_htk = Hotkey(
+            partial(trigger, driver), settings, f"Trigger [scripted text{name}]"
+        )
+        reset_htk = Hotkey(
+            partial(reset, driver), settings, f"Reset duration [scripted text{name}]"
+        )
+        hotkeys.append((trigger_htk, reset_htk))
 
 
 def script_description():
@@ -571,103 +2444,180 @@ def script_description():
     return "<h1>Scripted text</h1> \n <h2>with effects and media</h2> " + s
 
 
-def show_tooltip(props, prop, settings):
-    p = obs.obs_properties_get(props, "text_effect")
-    docs = getattr(std, std.effect + "_effect", "default")
-    if docs == "default":
-        selection = "[error]: there is no such effect".upper()
-        color = "red"
-    else:
-        selection = docs.__doc__
-        color = "green"
-    styled_docs = f'<h1 style="color:{color};">{selection}</h1>'
+def show_tooltip(index, props, prop, settings):
+    p = obs.obs_properties_get(props, slot_key("text_effect", index))
+    effect = obs.obs_data_get_string(settings, slot_key("text_effect", index))
+    chain = parse_chain(effect)
+    styled_docs = ""
+    for name in chain:
+        cls = effects.get(name)
+        if cls is None:
+            selection = f"[error]: there is no such effect {name}".upper()
+            color = "red"
+        else:
+            selection = cls.docs()
+            color = "green"
+        styled_docs += f'<h1 style="color:{color};">{selection}</h1>'
+        if cls is not None:
+            uses = ", ".join(cls.params) or "-"
+            styled_docs += f"<p>cost per tick: {cls.cost}, settings: {uses}</p>"
+    use_file = obs.obs_data_get_bool(settings, slot_key("use_file", index))
+    if set(chain) & set(TEMPLATE_EFFECTS) and not use_file:
+        text = obs.obs_data_get_string(settings, slot_key("scripted_text", index))
+        error = CompiledTemplate(text).error
+        if error:
+            styled_docs += f'<h2 style="color:red;">[template error]: {error}</h2>'
     obs.obs_property_set_long_description(p, styled_docs)
     return True
 
 
-def check_file_use(props, prop, settings):
-    p = obs.obs_properties_get(props, "file_path")
-    st = obs.obs_properties_get(props, "scripted_text")
-    p2 = obs.obs_properties_get(props, "reload_file")
-    obs.obs_property_set_visible(p, std.use_file)
-    obs.obs_property_set_visible(p2, std.use_file)
-    obs.obs_property_set_visible(st, not std.use_file)
+def show_profile(index, props, prop):
+    p = obs.obs_properties_get(props, slot_key("profile_info", index))
+    driver = slots[index] if index < len(slots) else None
+    profile = driver.profile if driver is not None else None
+    if profile is None:
+        text = "no profiled run yet, enable Profile ticks and trigger"
+    else:
+        text = profile.describe()
+    if driver is not None and driver.use_file:
+        text += "<br>" + driver.watched_file.describe()
+    obs.obs_property_set_description(p, text)
+    obs.obs_property_set_visible(p, True)
     return True
 
 
-def script_defaults(settings):
-    obs.obs_data_set_default_int(settings, "refresh_rate", std.refresh_rate)
-    obs.obs_data_set_default_int(settings, "duration", std.duration)
-    obs.obs_data_set_default_string(settings, "scripted_text", std.scripted_text)
-    obs.obs_data_set_default_string(settings, "text_effect", std.effect)
+def check_file_use(index, props, prop, settings):
+    use_file = obs.obs_data_get_bool(settings, slot_key("use_file", index))
+    p = obs.obs_properties_get(props, slot_key("file_path", index))
+    st = obs.obs_properties_get(props, slot_key("scripted_text", index))
+    p2 = obs.obs_properties_get(props, slot_key("reload_file", index))
+    obs.obs_property_set_visible(p, use_file)
+    obs.obs_property_set_visible(p2, use_file)
+    obs.obs_property_set_visible(st, not use_file)
+    return True
 
 
-def script_update(settings):
-    std.source_name = obs.obs_data_get_string(settings, "source")
-    std.use_file = obs.obs_data_get_bool(settings, "use_file")
-    std.reload_file = obs.obs_data_get_bool(settings, "reload_file")
-    if not std.use_file:
-        std.scripted_text = obs.obs_data_get_string(settings, "scripted_text")
-    else:
-        std.scripted_text = std.read_file(
-            obs.obs_data_get_string(settings, "file_path")
-        )
-        std.file_path = obs.obs_data_get_string(settings, "file_path")
-    std.effect = obs.obs_data_get_string(settings, "text_effect")
-    std.refresh_rate = obs.obs_data_get_int(settings, "refresh_rate")
-    std.effect_duration = 1000 * obs.obs_data_get_int(settings, "duration")
+def check_slot_count(props, prop, settings):
+    count = obs.obs_data_get_int(settings, "slot_count")
+    add_slots(props, count)
+    for i in range(MAX_SLOTS):
+        group = obs.obs_properties_get(props, slot_key("slot", i))
+        if group is not None:
+            obs.obs_property_set_visible(group, i < count)
+    return True
+
 
-    std.sound_source_name = obs.obs_data_get_string(settings, "playsound")
-    std.layer_source_name = obs.obs_data_get_string(settings, "layer")
-    std.stop_sound()
+def script_defaults(settings):
+    obs.obs_data_set_default_int(settings, "slot_count", 1)
+    for i in range(MAX_SLOTS):
+        key = partial(slot_key, index=i)
+        obs.obs_data_set_default_int(settings, key("refresh_rate"), std.refresh_rate)
+        obs.obs_data_set_default_int(
+            settings, key("duration"), std.effect_duration // 1000
+        )
+        obs.obs_data_set_default_string(
+            settings, key("scripted_text"), std.scripted_text
+        )
+        obs.obs_data_set_default_string(settings, key("text_effect"), std.effect)
+        obs.obs_data_set_default_string(settings, key("easing"), std.easing)
+        obs.obs_data_set_default_int(
+            settings, key("scramble_iterations"), std.scramble_iterations
+        )
+        obs.obs_data_set_default_string(
+            settings, key("scramble_chars"), std.scramble_chars
+        )
+        obs.obs_data_set_default_int(
+            settings, key("gradient_steps"), std.gradient_steps
+        )
+        obs.obs_data_set_default_string(settings, key("window_unit"), std.window_unit)
+        obs.obs_data_set_default_string(
+            settings, key("trigger_policy"), std.trigger_policy
+        )
+        obs.obs_data_set_default_int(settings, key("debounce"), std.debounce)
+        obs.obs_data_set_default_int(settings, key("queue_size"), 16)
+        obs.obs_data_set_default_string(
+            settings, key("queue_policy"), QUEUE_POLICIES[0]
+        )
 
 
-def script_properties():
-    props = obs.obs_properties_create()
-    obs.obs_properties_add_text(
-        props, "scripted_text", "Scripted text", obs.OBS_TEXT_MULTILINE
+def script_update(settings):
+    global slot_count
+    slot_count = max(1, obs.obs_data_get_int(settings, "slot_count"))
+    ensure_slots(slot_count, settings)
+    for driver in slots[slot_count:]:
+        driver.reset_duration()
+        driver.set_queue("")
+    for driver in slots[:slot_count]:
+        driver.configure(SlotConfig.read(settings, driver.index))
+
+
+def add_slot_properties(props, index):
+    """properties group of one effect slot, returns its source lists"""
+    key = partial(slot_key, index=index)
+    group = obs.obs_properties_create()
+    st = obs.obs_properties_add_text(
+        group, key("scripted_text"), "Scripted text", obs.OBS_TEXT_MULTILINE
+    )
+    obs.obs_property_set_modified_callback(st, partial(show_tooltip, index))
+    bool = obs.obs_properties_add_bool(group, key("use_file"), "Use file(UTF-8)")
+    bool2 = obs.obs_properties_add_bool(
+        group, key("reload_file"), "Auto reload file"
     )
-    bool = obs.obs_properties_add_bool(props, "use_file", "Use file(UTF-8)")
-    bool2 = obs.obs_properties_add_bool(props, "reload_file", "Auto reload file")
 
     fp = obs.obs_properties_add_path(
-        props, "file_path", "Select file", obs.OBS_PATH_FILE, "*.*", std.path
+        group, key("file_path"), "Select file", obs.OBS_PATH_FILE, "*.*", std.path
     )
 
-    obs.obs_property_set_visible(fp, std.use_file)
-    obs.obs_property_set_visible(bool2, std.use_file)
-    obs.obs_property_set_modified_callback(bool, check_file_use)
-    obs.obs_property_set_modified_callback(bool2, check_file_use)
+    use_file = index < len(slots) and slots[index].use_file
+    obs.obs_property_set_visible(fp, use_file)
+    obs.obs_property_set_visible(bool2, use_file)
+    obs.obs_property_set_modified_callback(bool, partial(check_file_use, index))
+    obs.obs_property_set_modified_callback(bool2, partial(check_file_use, index))
+    obs.obs_properties_add_int(
+        group, key("refresh_rate"), "Refresh rate(ms)", 15, 5 * 1000, 1
+    )
+    obs.obs_properties_add_int(
+        group, key("refresh_frames"), "Refresh rate(frames, 0 = use ms)", 0, 600, 1
+    )
+    obs.obs_properties_add_int(group, key("duration"), "Duration shown(s)", 1, 3600, 1)
+    trp = obs.obs_properties_add_list(
+        group,
+        key("trigger_policy"),
+        "Trigger while shown",
+        obs.OBS_COMBO_TYPE_LIST,
+        obs.OBS_COMBO_FORMAT_STRING,
+    )
+    for i in TRIGGER_POLICIES:
+        obs.obs_property_list_add_string(trp, i, i)
     obs.obs_properties_add_int(
-        props, "refresh_rate", "Refresh rate(ms)", 15, 5 * 1000, 1
+        group, key("debounce"), "Ignore repeated triggers(ms)", 0, 5 * 1000, 10
     )
-    obs.obs_properties_add_int(props, "duration", "Duration shown(s)", 1, 3600, 1)
 
     p = obs.obs_properties_add_list(
-        props,
-        "source",
+        group,
+        key("source"),
         "<h2>Text Source</h2>",
         obs.OBS_COMBO_TYPE_EDITABLE,
         obs.OBS_COMBO_FORMAT_STRING,
     )
     sp = obs.obs_properties_add_list(
-        props,
-        "playsound",
+        group,
+        key("playsound"),
         "Media Source",
         obs.OBS_COMBO_TYPE_EDITABLE,
         obs.OBS_COMBO_FORMAT_STRING,
     )
     tp = obs.obs_properties_add_list(
-        props,
-        "text_effect",
+        group,
+        key("text_effect"),
         "Text effect",
         obs.OBS_COMBO_TYPE_EDITABLE,
         obs.OBS_COMBO_FORMAT_STRING,
     )
 
     lp = obs.obs_properties_add_list(
-        props,
-        "layer",
+        group,
+        key("layer"),
         "Layer(img,video,gif,etc..)",
         obs.OBS_COMBO_TYPE_EDITABLE,
         obs.OBS_COMBO_FORMAT_STRING,
@@ -677,55 +2627,205 @@ def script_properties():
         tp, "<h1>Description of current text effect</h1>"
     )
 
-    for i in std.txt_efcts.keys():
+    for i in effects.names():
         obs.obs_property_list_add_string(tp, i, i)
-    obs.obs_property_set_modified_callback(tp, show_tooltip)
-
-    sources = obs.obs_enum_sources()
-    if sources is not None:
-        for source in sources:
-            # exclude Desktop Audio and Mic/Aux by their capabilities
-            capability_flags = obs.obs_source_get_output_flags(source)
-            if (
-                capability_flags & obs.OBS_SOURCE_DO_NOT_SELF_MONITOR
-            ) == 0 and capability_flags != (
-                obs.OBS_SOURCE_AUDIO | obs.OBS_SOURCE_DO_NOT_DUPLICATE
-            ):
-                source_id = obs.obs_source_get_unversioned_id(source)
-                if source_id == "text_gdiplus" or source_id == "text_ft2_source":
-                    name = obs.obs_source_get_name(source)
-                    obs.obs_property_list_add_string(p, name, name)
-                if source_id == "ffmpeg_source":
-                    name = obs.obs_source_get_name(source)
-                    obs.obs_property_list_add_string(sp, name, name)
-                else:
-                    name = obs.obs_source_get_name(source)
-                    obs.obs_property_list_add_string(lp, name, name)
+    obs.obs_property_set_modified_callback(tp, partial(show_tooltip, index))
+    ep = obs.obs_properties_add_list(
+        group,
+        key("easing"),
+        "Easing(fade,hue,tremor)",
+        obs.OBS_COMBO_TYPE_LIST,
+        obs.OBS_COMBO_FORMAT_STRING,
+    )
+    for i in EASINGS:
+        obs.obs_property_list_add_string(ep, i, i)
+    obs.obs_properties_add_bool(
+        group, key("tremor_all_scenes"), "Tremor in all scenes"
+    )
+    obs.obs_properties_add_int(
+        group, key("gradient_steps"), "Rainbow gradient steps", 1, 100, 1
+    )
+    obs.obs_properties_add_int(
+        group, key("scramble_iterations"), "Scramble iterations", 1, 100, 1
+    )
+    obs.obs_properties_add_text(
+        group, key("scramble_chars"), "Scramble chars", obs.OBS_TEXT_DEFAULT
+    )
 
-        obs.source_list_release(sources)
+    obs.obs_properties_add_int(
+        group, key("window_size"), "Window(0 = whole text)", 0, 1000, 1
+    )
+    wp = obs.obs_properties_add_list(
+        group,
+        key("window_unit"),
+        "Window unit",
+        obs.OBS_COMBO_TYPE_LIST,
+        obs.OBS_COMBO_FORMAT_STRING,
+    )
+    for i in ("lines", "chars"):
+        obs.obs_property_list_add_string(wp, i, i)
+    obs.obs_properties_add_bool(group, key("queue_mode"), "Queue mode")
+    obs.obs_properties_add_text(
+        group,
+        key("queue_source"),
+        "Queue from(file, named pipe or tcp:PORT)",
+        obs.OBS_TEXT_DEFAULT,
+    )
+    obs.obs_properties_add_int(group, key("queue_size"), "Queue size", 1, 1000, 1)
+    qp = obs.obs_properties_add_list(
+        group,
+        key("queue_policy"),
+        "When queue is full",
+        obs.OBS_COMBO_TYPE_LIST,
+        obs.OBS_COMBO_FORMAT_STRING,
+    )
+    for i in QUEUE_POLICIES:
+        obs.obs_property_list_add_string(qp, i, i)
 
-    scenes = obs.obs_frontend_get_scenes()  # for layered scene source
-    for scene in scenes:
-        name = obs.obs_source_get_name(scene)
-        obs.obs_property_list_add_string(lp, name, name)
-    obs.source_list_release(scenes)
+    obs.obs_properties_add_int(
+        group, key("seed"), "Seed(0 = random)", 0, 2 ** 31 - 1, 1
+    )
+    obs.obs_properties_add_bool(group, key("record"), "Record runs")
+    obs.obs_properties_add_path(
+        group,
+        key("record_folder"),
+        "Save recordings to",
+        obs.OBS_PATH_DIRECTORY,
+        None,
+        std.path,
+    )
+    obs.obs_properties_add_path(
+        group,
+        key("replay_file"),
+        "Replay file(replay effect)",
+        obs.OBS_PATH_FILE,
+        "Recordings (*.json.gz)",
+        std.path,
+    )
+    obs.obs_properties_add_bool(group, key("profile"), "Profile ticks")
+    obs.obs_properties_add_path(
+        group,
+        key("profile_folder"),
+        "Export profile to(csv, json)",
+        obs.OBS_PATH_DIRECTORY,
+        None,
+        std.path,
+    )
+    obs.obs_properties_add_button(
+        group, key("button3"), "SHOW PROFILE", partial(show_profile, index)
+    )
+    pi = obs.obs_properties_add_text(group, key("profile_info"), "", obs.OBS_TEXT_INFO)
+    obs.obs_property_set_visible(pi, False)  # until SHOW PROFILE
 
     obs.obs_properties_add_button(
-        props, "button1", "PREVIEW", lambda *props: std.hotkey_hook()
+        group,
+        key("button1"),
+        "PREVIEW",
+        lambda *props: index < len(slots) and slots[index].hotkey_hook(),
     )
 
     obs.obs_properties_add_button(
-        props, "button2", "RESET", lambda *props: std.reset_duration()
+        group,
+        key("button2"),
+        "RESET",
+        lambda *props: index < len(slots) and slots[index].reset_duration(),
+    )
+
+    g = obs.obs_properties_add_group(
+        props, key("slot"), f"Effect slot {index + 1}", obs.OBS_GROUP_NORMAL, group
     )
+    obs.obs_property_set_visible(g, index < slot_count)
+    return p, sp, lp
 
+
+def script_properties():
+    props = obs.obs_properties_create()
+    sc = obs.obs_properties_add_int(
+        props, "slot_count", "Effect slots", 1, MAX_SLOTS, 1
+    )
+    obs.obs_property_set_modified_callback(sc, check_slot_count)
+
+    effects.discover()
+    add_slots(props, slot_count)
     return props
 
 
+def add_slots(props, count):
+    """groups of first count slots which are not there yet, with source lists,
+    more are added when slot count grows"""
+    lists = [
+        add_slot_properties(props, i)
+        for i in range(count)
+        if obs.obs_properties_get(props, slot_key("slot", i)) is None
+    ]
+    for kind, kind_lists in zip(("text", "sound", "layer"), zip(*lists)):
+        for name in source_catalog.names(kind):
+            for i in kind_lists:
+                obs.obs_property_list_add_string(i, name, name)
+
+
 def script_save(settings):
-    h1.htk_copy.save_hotkey()
-    h2.htk_copy.save_hotkey()
+    for trigger_htk, reset_htk in hotkeys:
+        trigger_htk.save_hotkey()
+        reset_htk.save_hotkey()
+
+
+def script_tick(seconds):
+    # also when no slot is due, refs dropped by signals are freed within a frame
+    source_cache.release_stale()
+    scene_index.release_stale()
+    scheduler.frame_tick()
+
+
+def on_source_show(calldata):
+    """wakes slots which slept while their text source was hidden"""
+    name = obs.obs_source_get_name(obs.calldata_source(calldata, "source"))
+    for driver in slots:
+        if driver.source_name == name and not driver.lock:
+            scheduler.wake(driver)
+
+
+def stop_slots():
+    """end shown runs, their filters and source refs are released"""
+    for driver in slots:
+        if not driver.lock:
+            driver.stop()
+
+
+def on_frontend_event(event):
+    if event == obs.OBS_FRONTEND_EVENT_SCENE_CHANGED:
+        scene_index.on_scene_changed()
+    elif event == obs.OBS_FRONTEND_EVENT_SCENE_LIST_CHANGED:
+        scene_index.invalidate()
+    elif event in (
+        obs.OBS_FRONTEND_EVENT_SCENE_COLLECTION_CLEANUP,
+        obs.OBS_FRONTEND_EVENT_EXIT,
+    ):
+        stop_slots()  # before its sources go away
+        scene_index.invalidate()
+        source_cache.invalidate()
+        source_catalog.invalidate()
 
 
 def script_load(settings):
-    h1.htk_copy = Hotkey(trigger, settings, "Trigger [scripted text]")
-    h2.htk_copy = Hotkey(reset, settings, "Reset duration [scripted text]")
+    effects.discover()
+    source_cache.connect()
+    source_catalog.connect()
+    handler = obs.obs_get_signal_handler()
+    obs.signal_handler_connect(handler, "source_show", on_source_show)
+    obs.obs_frontend_add_event_callback(on_frontend_event)
+    ensure_slots(max(1, obs.obs_data_get_int(settings, "slot_count")), settings)
+
+
+def script_unload():
+    # slots first, stopping them uses the caches torn down after
+    stop_slots()
+    for driver in slots:
+        driver.set_queue("")
+    file_worker.stop()
+    obs.obs_frontend_remove_event_callback(on_frontend_event)
+    handler = obs.obs_get_signal_handler()
+    obs.signal_handler_disconnect(handler, "source_show", on_source_show)
+    source_cache.disconnect()
+    source_catalog.disconnect()
+    scene_index.invalidate()